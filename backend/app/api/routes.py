@@ -1,12 +1,20 @@
-import json
+import asyncio
 import logging
+import math
 from collections.abc import AsyncGenerator
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
+from app.api.streaming import coalesce_tokens
+from app.core.concurrency import OverloadedError, chat_stream_limiter
+from app.core.config import settings
+from app.core.metrics import RequestTimings, counters, current_timings, observe_stage
+from app.core.serialization import dumps, encode_event
 from app.schemas.chat import ChatRequest
 from app.services.llm import stream_chat
+from app.services.sessions import SessionError, session_store
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -26,19 +34,84 @@ async def chat_stream(request: ChatRequest) -> StreamingResponse:
         if len(msg.content) > 2000:
             raise HTTPException(status_code=400, detail="Message content too long. Maximum 2000 characters allowed.")
 
+    session_id = request.session_id
+    history: list[dict] | None = None
+    if session_id:
+        history = await session_store.load(session_id)
+        if history is None:
+            raise HTTPException(status_code=404, detail="Session not found or expired. Resend the full conversation.")
+    elif request.start_session:
+        session_id = session_store.create()
+        history = []
+
+    turn: str | None = None
+    if session_id:
+        try:
+            turn = session_store.begin_turn(session_id)
+        except SessionError as exc:
+            raise HTTPException(status_code=409, detail=str(exc))
+
+    try:
+        await chat_stream_limiter.acquire()
+    except OverloadedError as exc:
+        if turn:
+            session_store.end_turn(session_id, turn)
+        logger.warning(f"Rejecting chat stream: {exc}")
+        raise HTTPException(
+            status_code=503,
+            detail="The service is busy right now. Please try again in a moment.",
+            headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+        )
+
+    released = False
+
+    def release_stream() -> None:
+        # Runs from the generator's cleanup and again as the response's
+        # background task, which Starlette still runs when the client goes away
+        # before the generator starts.
+        nonlocal released
+        if not released:
+            released = True
+            chat_stream_limiter.release()
+            if turn:
+                session_store.end_turn(session_id, turn)
+
     async def event_generator() -> AsyncGenerator[str, None]:
+        disconnected = False
+        first_token_sent = False
+        timings = RequestTimings()
+        current_timings.set(timings)
+        transcript: list[dict] = []
+        events = coalesce_tokens(
+            stream_chat(request.messages, request.settings, history, transcript),
+            settings.sse_coalesce_window_ms / 1000,
+            settings.sse_coalesce_max_chars,
+        )
         try:
-            async for event in stream_chat(request.messages, request.settings):
+            if session_id:
+                yield f"data: {dumps({'type': 'session', 'id': session_id})}\n\n"
+            # Starlette cancels this generator when the client goes away, so
+            # disconnects surface as CancelledError without polling per event.
+            async for event in events:
+                if event.get("type") == "done":
+                    # Sent below, after the debug timings, as the last event.
+                    continue
+                if event.get("type") == "token" and not first_token_sent:
+                    first_token_sent = True
+                    observe_stage("time_to_first_token", timings.elapsed())
                 try:
-                    yield f"data: {json.dumps(event)}\n\n"
+                    yield f"data: {encode_event(event)}\n\n"
                 except (TypeError, ValueError) as e:
                     logger.error(f"Failed to serialize event: {e}", exc_info=True)
                     error_event = {
                         "type": "error",
                         "message": "Failed to process response. Please try again.",
                     }
-                    yield f"data: {json.dumps(error_event)}\n\n"
+                    yield f"data: {dumps(error_event)}\n\n"
                     break
+        except asyncio.CancelledError:
+            disconnected = True
+            raise
         except Exception as e:
             logger.error(f"Stream error: {e}", exc_info=True)
             error_event = {
@@ -46,11 +119,29 @@ async def chat_stream(request: ChatRequest) -> StreamingResponse:
                 "message": f"An error occurred: {str(e)}",
             }
             try:
-                yield f"data: {json.dumps(error_event)}\n\n"
+                yield f"data: {dumps(error_event)}\n\n"
             except Exception:
                 logger.error("Failed to send error event", exc_info=True)
         finally:
-            yield "data: {\"type\": \"done\"}\n\n"
+            await events.aclose()
+            observe_stage("stream_total", timings.elapsed())
+            # Only complete turns are kept so a failed reply can simply be retried.
+            if not disconnected and session_id and transcript and transcript[-1].get("role") == "assistant":
+                await session_store.save(session_id, history + transcript)
+            release_stream()
+            if disconnected:
+                logger.info("Client disconnected; cancelled chat stream")
+                counters.inc("chat_streams_disconnected")
+            else:
+                if settings.debug:
+                    yield f"data: {dumps({'type': 'timing', 'stages': timings.summary()})}\n\n"
+                yield "data: {\"type\": \"done\"}\n\n"
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    try:
+        return StreamingResponse(
+            event_generator(), media_type="text/event-stream", background=BackgroundTask(release_stream)
+        )
+    except BaseException:
+        release_stream()
+        raise
 
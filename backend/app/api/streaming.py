@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncGenerator
+from contextlib import aclosing
+
+_END = object()
+
+
+def _cancel(timer: asyncio.TimerHandle | None) -> None:
+    if timer is not None:
+        timer.cancel()
+    return None
+
+
+async def coalesce_tokens(
+    events: AsyncGenerator[dict, None], window_seconds: float, max_chars: int
+) -> AsyncGenerator[dict, None]:
+    if window_seconds <= 0:
+        async with aclosing(events):
+            async for event in events:
+                yield event
+        return
+
+    loop = asyncio.get_running_loop()
+    # One reader task feeds a queue; the window is a timer that drops a flush
+    # marker into the same queue, so no task is created per event.
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump() -> None:
+        try:
+            async for event in events:
+                queue.put_nowait(event)
+        except Exception as exc:
+            queue.put_nowait(exc)
+        finally:
+            queue.put_nowait(_END)
+
+    reader = asyncio.ensure_future(pump())
+    buffer: list[str] = []
+    buffered_chars = 0
+    in_tokens = False
+    flush_marker: object | None = None
+    timer: asyncio.TimerHandle | None = None
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                break
+            if isinstance(item, BaseException):
+                # Tokens that already arrived still go out before the error.
+                if buffer:
+                    timer = _cancel(timer)
+                    yield {"type": "token", "value": "".join(buffer)}
+                    buffer, buffered_chars = [], 0
+                raise item
+            if not isinstance(item, dict):
+                # A flush marker; ones from cancelled windows are ignored.
+                if item is flush_marker:
+                    flush_marker, timer = None, None
+                    yield {"type": "token", "value": "".join(buffer)}
+                    buffer, buffered_chars = [], 0
+                continue
+
+            if item.get("type") == "token":
+                if not in_tokens:
+                    # The first token of a run goes out at once so coalescing
+                    # never adds to time-to-first-token.
+                    in_tokens = True
+                    yield item
+                    continue
+                buffer.append(item.get("value", ""))
+                buffered_chars += len(buffer[-1])
+                if buffered_chars >= max_chars:
+                    timer = _cancel(timer)
+                    flush_marker = None
+                    yield {"type": "token", "value": "".join(buffer)}
+                    buffer, buffered_chars = [], 0
+                elif timer is None:
+                    flush_marker = object()
+                    timer = loop.call_later(window_seconds, queue.put_nowait, flush_marker)
+                continue
+
+            in_tokens = False
+            if buffer:
+                timer = _cancel(timer)
+                flush_marker = None
+                yield {"type": "token", "value": "".join(buffer)}
+                buffer, buffered_chars = [], 0
+            yield item
+
+        if buffer:
+            yield {"type": "token", "value": "".join(buffer)}
+    finally:
+        _cancel(timer)
+        # Cancelling the reader also finalizes the upstream stream it owns.
+        if not reader.done():
+            reader.cancel()
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from app.core.config import settings
+
+
+class OverloadedError(RuntimeError):
+    def __init__(self, name: str, retry_after: float) -> None:
+        super().__init__(f"{name} is at capacity")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class Limiter:
+    def __init__(self, name: str, limit: int, max_queue: int, max_wait_seconds: float) -> None:
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait_seconds = 0.0
+        self.max_observed_wait_seconds = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        if self.limit <= 0:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise OverloadedError(self.name, self.max_wait_seconds or 1.0)
+
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout=self.max_wait_seconds or None)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise OverloadedError(self.name, self.max_wait_seconds) from None
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        waited = time.perf_counter() - started
+        self.total_wait_seconds += waited
+        self.max_observed_wait_seconds = max(self.max_observed_wait_seconds, waited)
+        self.admitted += 1
+
+    def try_acquire(self) -> bool:
+        # Takes a free slot without queueing, for optional work such as hedges.
+        if self.limit > 0 and (self.in_flight >= self.limit or self._waiters):
+            return False
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot is handed over directly so in_flight stays the same.
+                waiter.set_result(None)
+                return
+        self.in_flight = max(0, self.in_flight - 1)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_ms": round(1000 * self.total_wait_seconds / self.admitted, 2) if self.admitted else 0.0,
+            "max_wait_ms": round(1000 * self.max_observed_wait_seconds, 2),
+        }
+
+
+chat_stream_limiter = Limiter(
+    "chat streams",
+    settings.max_concurrent_chat_streams,
+    settings.chat_stream_queue_size,
+    settings.admission_queue_timeout_seconds,
+)
+geocode_limiter = Limiter(
+    "geocoding API",
+    settings.geocode_max_concurrency,
+    settings.upstream_queue_size,
+    settings.upstream_queue_timeout_seconds,
+)
+forecast_limiter = Limiter(
+    "forecast API",
+    settings.forecast_max_concurrency,
+    settings.upstream_queue_size,
+    settings.upstream_queue_timeout_seconds,
+)
+openai_limiter = Limiter(
+    "OpenAI API",
+    settings.openai_max_concurrency,
+    settings.upstream_queue_size,
+    settings.upstream_queue_timeout_seconds,
+)
+
+
+def limiter_stats() -> dict:
+    return {
+        limiter.name: limiter.stats()
+        for limiter in (chat_stream_limiter, geocode_limiter, forecast_limiter, openai_limiter)
+    }
@@ -1,17 +1,82 @@
+from typing import Literal
+
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from app.core.constants import FORECAST_API_URL, GEOCODE_API_URL
+
 
 class Settings(BaseSettings):
     app_name: str = "Lundy Weather Chat"
     environment: str = "development"
+    debug: bool = False
     openai_api_key: str = ""
     openai_model: str = "gpt-4o-mini"
     openai_base_url: str | None = None
+    openai_max_connections: int = 50
+    openai_max_keepalive_connections: int = 20
+    openai_keepalive_expiry_seconds: float = 60.0
     allow_origins: list[str] = ["http://localhost:5173"]
+    geocode_api_url: str = GEOCODE_API_URL
+    forecast_api_url: str = FORECAST_API_URL
+    gazetteer_path: str | None = None
     http_timeout_seconds: float = 10.0
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry_seconds: float = 30.0
+    http2_enabled: bool = False
     forecast_days: int = 3
     max_locations_per_request: int = 10
+    max_streamed_locations_per_request: int = 50
+    weather_stream_chunk_size: int = 5
+    weather_stream_concurrency: int = 4
+    max_concurrent_tool_calls: int = 4
+    session_store_size: int = 1000
+    session_ttl_seconds: float = 3600.0
+    session_max_messages: int = 100
+    session_db_path: str | None = None
+    session_turn_lease_seconds: float = 300.0
+    speculative_prefetch_enabled: bool = True
+    fast_path_enabled: bool = False
+    sse_coalesce_window_ms: float = 20.0
+    sse_coalesce_max_chars: int = 256
+    max_concurrent_chat_streams: int = 100
+    chat_stream_queue_size: int = 50
+    admission_queue_timeout_seconds: float = 5.0
+    geocode_max_concurrency: int = 20
+    forecast_max_concurrency: int = 20
+    openai_max_concurrency: int = 50
+    upstream_queue_size: int = 200
+    upstream_queue_timeout_seconds: float = 5.0
+    upstream_max_retries: int = 2
+    upstream_retry_base_delay_seconds: float = 0.2
+    upstream_retry_max_delay_seconds: float = 2.0
+    upstream_deadline_seconds: float = 15.0
+    hedged_requests_enabled: bool = False
+    hedge_latency_percentile: float = 95.0
+    circuit_breaker_failure_threshold: int = 5
+    circuit_breaker_reset_seconds: float = 30.0
+    forecast_stale_ttl_seconds: float = 3600.0
+    forecast_warmer_enabled: bool = True
+    forecast_warmer_top_n: int = 200
+    forecast_warmer_refresh_ahead_seconds: float = 30.0
+    forecast_warmer_jitter_seconds: float = 20.0
+    forecast_warmer_requests_per_second: float = 2.0
+    popularity_capacity: int = 2000
+    popularity_half_life_seconds: float = 3600.0
+    cache_backend: Literal["memory", "sqlite"] = "memory"
+    cache_sqlite_path: str = "weather_cache.sqlite3"
+    geocode_cache_size: int = 5000
+    geocode_cache_ttl_seconds: float = 604800.0
+    geocode_negative_ttl_seconds: float = 300.0
+    forecast_cache_size: int = 2000
+    forecast_cache_ttl_seconds: float = 900.0
+    forecast_grid_precision: int = 2
+    forecast_batch_size: int = 25
+    tool_payload_token_budget: int = 1500
+    tool_payload_hourly_window: int = 24
+    context_token_budget: int = 6000
+    context_summary_token_budget: int = 600
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
@@ -4,3 +4,64 @@ DEFAULT_FORECAST_DAYS = 3
 DEFAULT_HTTP_TIMEOUT = 10.0
 MAX_LOCATIONS_PER_REQUEST = 10
 
+CURRENT_VARIABLES = [
+    "temperature_2m",
+    "relative_humidity_2m",
+    "apparent_temperature",
+    "precipitation",
+    "weather_code",
+    "wind_speed_10m",
+    "wind_direction_10m",
+]
+HOURLY_VARIABLES = [
+    "temperature_2m",
+    "precipitation_probability",
+    "weather_code",
+    "wind_speed_10m",
+]
+DAILY_VARIABLES = [
+    "weather_code",
+    "temperature_2m_max",
+    "temperature_2m_min",
+    "precipitation_sum",
+    "wind_speed_10m_max",
+    "sunrise",
+    "sunset",
+]
+# Variable groups fetched for each get_weather detail level, smallest first.
+DETAIL_GROUPS = {
+    "current": ("current",),
+    "daily": ("current", "daily"),
+    "hourly": ("current", "hourly"),
+    "full": ("current", "hourly", "daily"),
+}
+WEATHER_CODE_LABELS = {
+    0: "clear sky",
+    1: "mainly clear",
+    2: "partly cloudy",
+    3: "overcast",
+    45: "fog",
+    48: "rime fog",
+    51: "light drizzle",
+    53: "drizzle",
+    55: "dense drizzle",
+    56: "light freezing drizzle",
+    57: "freezing drizzle",
+    61: "light rain",
+    63: "rain",
+    65: "heavy rain",
+    66: "light freezing rain",
+    67: "freezing rain",
+    71: "light snow",
+    73: "snow",
+    75: "heavy snow",
+    77: "snow grains",
+    80: "light showers",
+    81: "showers",
+    82: "violent showers",
+    85: "light snow showers",
+    86: "snow showers",
+    95: "thunderstorm",
+    96: "thunderstorm with light hail",
+    99: "thunderstorm with hail",
+}
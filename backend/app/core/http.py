@@ -1,8 +1,72 @@
+import logging
+
 import httpx
 
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+_http_client: httpx.AsyncClient | None = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
 
 def create_http_client() -> httpx.AsyncClient:
-    return httpx.AsyncClient(timeout=settings.http_timeout_seconds)
+    http2 = settings.http2_enabled
+    if http2 and not _http2_available():
+        logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+        http2 = False
+    return httpx.AsyncClient(
+        timeout=settings.http_timeout_seconds,
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        ),
+        http2=http2,
+    )
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = create_http_client()
+    return _http_client
+
+
+def pool_stats(client: httpx.AsyncClient | None) -> dict:
+    # Best effort: httpx exposes no pool stats, so this reads httpx/httpcore
+    # internals and reports nothing if a release changes them.
+    if client is None or client.is_closed:
+        return {"open": False}
+    try:
+        pool = getattr(client._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        return {
+            "open": True,
+            "connections": len(connections),
+            "idle": sum(1 for conn in connections if conn.is_idle()),
+            "active": sum(1 for conn in connections if not conn.is_idle()),
+            "queued_requests": len(getattr(pool, "_requests", []) or []),
+            "http2": sum(1 for conn in connections if "HTTP/2" in repr(conn)),
+        }
+    except Exception as exc:
+        logger.debug(f"Connection pool stats unavailable: {exc}")
+        return {}
+
 
+def http_pool_stats() -> dict:
+    return pool_stats(_http_client)
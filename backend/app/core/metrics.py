@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import bisect
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+def _label_key(labels: dict[str, str]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: LabelKey, extra: tuple[tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    rendered = ",".join(f'{key}="{value}"' for key, value in pairs)
+    return f"{{{rendered}}}"
+
+
+class Counters:
+    def __init__(self) -> None:
+        self._values: defaultdict[tuple[str, LabelKey], float] = defaultdict(float)
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        self._values[(name, _label_key(labels))] += amount
+
+    def get(self, name: str, **labels: str) -> float:
+        return self._values.get((name, _label_key(labels)), 0)
+
+    def snapshot(self) -> dict[str, float]:
+        return {
+            f"{name}{_format_labels(labels)}": value for (name, labels), value in sorted(self._values.items())
+        }
+
+    def render(self, prefix: str) -> list[str]:
+        lines = []
+        seen: set[str] = set()
+        for (name, labels), value in sorted(self._values.items()):
+            metric = f"{prefix}_{name}"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} counter")
+                seen.add(metric)
+            lines.append(f"{metric}{_format_labels(labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Histograms:
+    def __init__(self) -> None:
+        self._histograms: dict[tuple[str, LabelKey], Histogram] = {}
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, _label_key(labels))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def render(self, prefix: str) -> list[str]:
+        lines = []
+        seen: set[str] = set()
+        for (name, labels), histogram in sorted(self._histograms.items()):
+            metric = f"{prefix}_{name}"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} histogram")
+                seen.add(metric)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{metric}_bucket{_format_labels(labels, (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{metric}_bucket{_format_labels(labels, (('le', '+Inf'),))} {histogram.count}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.total}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+        return lines
+
+
+class RequestTimings:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self._stages: dict[str, list[float]] = {}
+
+    def record(self, stage: str, seconds: float) -> None:
+        self._stages.setdefault(stage, []).append(seconds)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {
+            stage: {
+                "count": len(values),
+                "total_ms": round(sum(values) * 1000, 1),
+                "max_ms": round(max(values) * 1000, 1),
+            }
+            for stage, values in self._stages.items()
+        }
+
+
+counters = Counters()
+histograms = Histograms()
+current_timings: ContextVar[RequestTimings | None] = ContextVar("current_timings", default=None)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    histograms.observe("stage_duration_seconds", seconds, stage=stage)
+    timings = current_timings.get()
+    if timings is not None:
+        timings.record(stage, seconds)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+def _flatten(prefix: str, stats: dict) -> Iterator[tuple[str, float]]:
+    for key, value in stats.items():
+        name = f"{prefix}_{key}".replace(" ", "_").replace("-", "_").lower()
+        if isinstance(value, dict):
+            yield from _flatten(name, value)
+        elif isinstance(value, bool):
+            yield name, float(value)
+        elif isinstance(value, (int, float)):
+            yield name, float(value)
+
+
+def render_prometheus(gauges: dict[str, dict], prefix: str = "lundy") -> str:
+    lines = counters.render(prefix) + histograms.render(prefix)
+    for group, stats in gauges.items():
+        for name, value in _flatten(f"{prefix}_{group}", stats):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
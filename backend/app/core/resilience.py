@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+
+import httpx
+
+from app.core.concurrency import Limiter
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (httpx.TimeoutException, httpx.TransportError)
+
+
+class DeadlineExceededError(httpx.TimeoutException):
+    pass
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, name: str, retry_after: float) -> None:
+        super().__init__(f"{name} circuit is open")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, reset_timeout_seconds: float) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.failure_threshold <= 0 or self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout_seconds:
+            self.state = "half_open"
+            self._probe_in_flight = False
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.reset_timeout_seconds - (time.monotonic() - self.opened_at))
+
+    def release_probe(self) -> None:
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            logger.info(f"{self.name} circuit closed")
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.failure_threshold <= 0:
+            return
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"{self.name} circuit opened after {self.consecutive_failures} failures")
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "retry_after_seconds": round(self.retry_after(), 1) if self.state == "open" else 0.0,
+        }
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 200) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, percentile: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class ResilientUpstream:
+    def __init__(
+        self,
+        name: str,
+        *,
+        max_retries: int,
+        retry_base_delay: float,
+        retry_max_delay: float,
+        failure_threshold: int,
+        reset_timeout_seconds: float,
+        hedge_enabled: bool = False,
+        hedge_percentile: float = 95.0,
+        hedge_min_samples: int = 20,
+        limiter: Limiter | None = None,
+        deadline_seconds: float = 0.0,
+    ) -> None:
+        self.name = name
+        self.limiter = limiter
+        self.deadline_seconds = deadline_seconds
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout_seconds)
+        self.latency = LatencyTracker()
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedges_skipped = 0
+
+    def _hedge_delay(self) -> float | None:
+        if not self.hedge_enabled or len(self.latency) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(self.hedge_percentile)
+
+    async def _timed_get(self, client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await client.get(url, **kwargs)
+        if response.status_code < 500:
+            self.latency.observe(time.perf_counter() - started)
+        return response
+
+    async def _hedged_get(self, client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+        delay = self._hedge_delay()
+        primary = asyncio.ensure_future(self._timed_get(client, url, **kwargs))
+        if delay is None:
+            return await primary
+
+        attempts = [primary]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done:
+                # A hedge needs its own slot so it never pushes real upstream
+                # concurrency past the limit; without a free one, keep waiting.
+                if self.limiter is None or self.limiter.try_acquire():
+                    self.hedges += 1
+                    hedge = asyncio.ensure_future(self._timed_get(client, url, **kwargs))
+                    if self.limiter is not None:
+                        hedge.add_done_callback(lambda _: self.limiter.release())
+                    attempts.append(hedge)
+                else:
+                    self.hedges_skipped += 1
+            while True:
+                done, _ = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    attempts.remove(attempt)
+                    if attempt.exception() is None or not attempts:
+                        if attempt is not primary and attempt.exception() is None:
+                            self.hedge_wins += 1
+                        return attempt.result()
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    async def _attempt(
+        self, client: httpx.AsyncClient, url: str, deadline: float | None, timeout: float | None, **kwargs
+    ) -> httpx.Response:
+        if self.limiter is not None:
+            await self.limiter.acquire()
+        try:
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DeadlineExceededError(f"{self.name} request deadline exceeded")
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            return await self._hedged_get(client, url, timeout=timeout, **kwargs)
+        finally:
+            if self.limiter is not None:
+                self.limiter.release()
+
+    async def get(
+        self, client: httpx.AsyncClient, url: str, timeout: float | None = None, **kwargs
+    ) -> httpx.Response:
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.name, self.breaker.retry_after())
+
+        # Every attempt, backoff and hedge has to fit in one overall deadline.
+        deadline = time.monotonic() + self.deadline_seconds if self.deadline_seconds > 0 else None
+        attempt = 0
+        while True:
+            try:
+                response = await self._attempt(client, url, deadline, timeout, **kwargs)
+                if response.status_code < 500:
+                    self.breaker.record_success()
+                    return response
+                error: Exception = httpx.HTTPStatusError(
+                    f"Server error '{response.status_code}' for url '{response.url}'",
+                    request=response.request,
+                    response=response,
+                )
+            except DeadlineExceededError:
+                self.breaker.release_probe()
+                raise
+            except RETRYABLE_ERRORS as exc:
+                error = exc
+            except BaseException:
+                self.breaker.release_probe()
+                raise
+
+            self.breaker.record_failure()
+            if attempt >= self.max_retries or self.breaker.state == "open":
+                raise error
+            backoff = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2**attempt))
+            if deadline is not None and time.monotonic() + backoff >= deadline:
+                raise error
+            attempt += 1
+            self.retries += 1
+            # The limiter slot was released after the attempt, so backing off
+            # doesn't hold capacity other requests could use.
+            await asyncio.sleep(backoff)
+
+    def stats(self) -> dict:
+        p95 = self.latency.percentile(95)
+        return {
+            **self.breaker.stats(),
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedges_skipped": self.hedges_skipped,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class RawJSON(str):
+    pass
+
+
+def dumps(value: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(value).decode("utf-8")
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def encode_event(event: dict) -> str:
+    raw_fields = {key: value for key, value in event.items() if isinstance(value, RawJSON)}
+    if not raw_fields:
+        return dumps(event)
+    encoded = dumps({key: value for key, value in event.items() if key not in raw_fields})
+    spliced = ",".join(f"{dumps(key)}:{value}" for key, value in raw_fields.items())
+    separator = "," if encoded != "{}" else ""
+    return f"{encoded[:-1]}{separator}{spliced}}}"
@@ -1,15 +1,41 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.api.handlers import register_exception_handlers
 from app.api.routes import router
+from app.core.concurrency import limiter_stats
 from app.core.config import settings
+from app.core.http import close_http_client, get_http_client, http_pool_stats
 from app.core.logging import setup_logging
+from app.core.metrics import counters, render_prometheus
+from app.services.llm_client import close_openai_client, get_openai_client, openai_pool_stats
+from app.services.sessions import session_store
+from app.services.warmer import start_forecast_warmer, stop_forecast_warmer
+from app.services.weather import get_gazetteer, upstream_health, weather_cache_stats
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    get_http_client()
+    if settings.openai_api_key:
+        get_openai_client()
+    get_gazetteer()
+    start_forecast_warmer()
+    try:
+        yield
+    finally:
+        await stop_forecast_warmer()
+        await close_openai_client()
+        await close_http_client()
 
 
 def create_app() -> FastAPI:
     setup_logging()
-    app = FastAPI(title=settings.app_name)
+    app = FastAPI(title=settings.app_name, lifespan=lifespan)
 
     app.add_middleware(
         CORSMiddleware,
@@ -24,10 +50,35 @@ def create_app() -> FastAPI:
 
     @app.get("/health")
     async def health_check() -> dict:
-        return {"status": "ok"}
+        upstreams = upstream_health()
+        degraded = any(upstream["state"] != "closed" for upstream in upstreams.values())
+        return {
+            "status": "degraded" if degraded else "ok",
+            "upstreams": upstreams,
+            # Read from httpx internals; may be empty after an httpx upgrade.
+            "http_pool": {**http_pool_stats(), "best_effort": True},
+            "openai_pool": {**openai_pool_stats(), "best_effort": True},
+            "caches": weather_cache_stats(),
+            "counters": counters.snapshot(),
+            "limiters": limiter_stats(),
+            "sessions": session_store.stats(),
+        }
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics() -> PlainTextResponse:
+        body = render_prometheus(
+            {
+                "cache": weather_cache_stats(),
+                "limiter": limiter_stats(),
+                "session": session_store.stats(),
+                "upstream": upstream_health(),
+                "http_pool": http_pool_stats(),
+                "openai_pool": openai_pool_stats(),
+            }
+        )
+        return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
 
     return app
 
 
 app = create_app()
-
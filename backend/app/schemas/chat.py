@@ -17,4 +17,6 @@ class ChatSettings(BaseModel):
 class ChatRequest(BaseModel):
     messages: list[ChatMessage]
     settings: ChatSettings = Field(default_factory=ChatSettings)
+    session_id: str | None = Field(default=None, alias="sessionId", max_length=64)
+    start_session: bool = Field(default=False, alias="startSession")
 
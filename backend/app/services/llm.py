@@ -1,35 +1,136 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import time
 from collections.abc import AsyncGenerator
+from contextlib import aclosing
 
 from openai import APIError, APITimeoutError, RateLimitError
 
+from app.core.concurrency import OverloadedError, openai_limiter
 from app.core.config import settings
+from app.core.metrics import counters, observe_stage
+from app.core.serialization import RawJSON, dumps
 from app.schemas.chat import ChatMessage, ChatSettings
-from app.services.llm_client import create_openai_client
-from app.services.llm_prompts import build_system_prompt
-from app.services.llm_tools import run_tool, tool_definitions
+from app.services.llm_client import get_openai_client
+from app.services.llm_compaction import compact_tool_result
+from app.services.llm_context import window_messages
+from app.services.llm_prompts import system_messages
+from app.services.llm_router import route_fast_path
+from app.services.llm_tools import ToolPrefetcher, stream_tool, tool_definitions
 from app.services.weather import WeatherError
 
 logger = logging.getLogger(__name__)
 
+BUSY_MESSAGE = "The assistant is handling a lot of requests right now. Please try again in a moment."
 
-def _to_openai_messages(messages: list[ChatMessage], settings_obj: ChatSettings) -> list[dict]:
-    formatted = [{"role": "system", "content": build_system_prompt(settings_obj)}]
-    for message in messages:
-        payload: dict = {"role": message.role, "content": message.content}
-        if message.name:
-            payload["name"] = message.name
-        if message.tool_call_id:
-            payload["tool_call_id"] = message.tool_call_id
-        formatted.append(payload)
-    return formatted
+_closing_streams: set[asyncio.Task] = set()
+
+
+def _message_payload(message: ChatMessage) -> dict:
+    payload: dict = {"role": message.role, "content": message.content}
+    if message.name:
+        payload["name"] = message.name
+    if message.tool_call_id:
+        payload["tool_call_id"] = message.tool_call_id
+    return payload
+
+
+def _to_openai_messages(
+    messages: list[ChatMessage], settings_obj: ChatSettings, history: list[dict] | None = None
+) -> list[dict]:
+    formatted = system_messages(settings_obj)
+    if history:
+        formatted.extend(history)
+    formatted.extend(_message_payload(message) for message in messages)
+    return window_messages(formatted)
+
+
+def _close_stream(stream, finished: bool) -> None:
+    # Closing is scheduled rather than awaited so it still happens when the
+    # surrounding task is being cancelled by a client disconnect.
+    if not finished:
+        counters.inc("llm_streams_aborted")
+    close = getattr(stream, "close", None)
+    if close is None:
+        return
+    task = asyncio.ensure_future(close())
+    _closing_streams.add(task)
+    task.add_done_callback(_closing_streams.discard)
+
+
+def _record_usage(chunk, stage: str) -> None:
+    usage = getattr(chunk, "usage", None)
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+    counters.inc("llm_prompt_tokens_total", usage.prompt_tokens or 0, stage=stage)
+    counters.inc("llm_cached_prompt_tokens_total", cached, stage=stage)
+    counters.inc("llm_completion_tokens_total", usage.completion_tokens or 0, stage=stage)
+    logger.info(f"{stage} completion used {usage.prompt_tokens} prompt tokens ({cached} cached)")
+
+
+async def _execute_tool_call(
+    index: int, call: dict, settings_obj: ChatSettings, limit: asyncio.Semaphore, events: asyncio.Queue
+) -> None:
+    # Each result goes on ``events`` as it arrives, followed by a final entry
+    # carrying the content for the model's tool message.
+    results: dict[int, dict] = {}
+    error_payload = None
+    try:
+        async with limit:
+            async with aclosing(stream_tool(call["name"], call["arguments"], settings_obj)) as payloads:
+                async for position, payload in payloads:
+                    results[position] = payload
+                    await events.put((index, payload, None))
+        ordered = [results[position] for position in sorted(results)]
+        content = compact_tool_result(ordered[0] if len(ordered) == 1 else {"results": ordered})
+    except WeatherError as exc:
+        logger.warning(f"Weather error: {exc}")
+        counters.inc("errors_total", type="weather")
+        error_payload = {"error": True, "message": str(exc)}
+    except Exception as e:
+        logger.error(f"Unexpected tool error: {e}", exc_info=True)
+        counters.inc("errors_total", type="tool_unexpected")
+        error_payload = {"error": True, "message": "An unexpected error occurred while fetching weather data."}
+    if error_payload is not None:
+        await events.put((index, error_payload, None))
+        content = json.dumps(error_payload)
+    await events.put((index, None, content))
 
 
 async def stream_chat(
-    messages: list[ChatMessage], settings_obj: ChatSettings
+    messages: list[ChatMessage],
+    settings_obj: ChatSettings,
+    history: list[dict] | None = None,
+    transcript: list[dict] | None = None,
+) -> AsyncGenerator[dict, None]:
+    # ``history`` holds earlier turns of a server-side session; the new messages
+    # and everything the model produces are appended to ``transcript``.
+    prefetcher = ToolPrefetcher() if settings.speculative_prefetch_enabled else None
+    if transcript is None:
+        transcript = []
+    try:
+        async with aclosing(_stream_chat(messages, settings_obj, prefetcher, history, transcript)) as events:
+            async for event in events:
+                yield event
+    except (asyncio.CancelledError, GeneratorExit):
+        counters.inc("chat_streams_cancelled")
+        raise
+    finally:
+        if prefetcher is not None:
+            prefetcher.cancel()
+
+
+async def _stream_chat(
+    messages: list[ChatMessage],
+    settings_obj: ChatSettings,
+    prefetcher: ToolPrefetcher | None,
+    history: list[dict] | None,
+    transcript: list[dict],
 ) -> AsyncGenerator[dict, None]:
     if not settings.openai_api_key:
         yield {"type": "error", "message": "OpenAI API key is missing. Set OPENAI_API_KEY."}
@@ -37,90 +138,140 @@ async def stream_chat(
 
     yield {"type": "status", "message": "Analyzing your request..."}
 
-    client = create_openai_client()
+    client = get_openai_client()
 
-    base_messages = _to_openai_messages(messages, settings_obj)
+    base_messages = _to_openai_messages(messages, settings_obj, history)
+    transcript.extend(_message_payload(message) for message in messages)
     tool_defs = tool_definitions()
 
     tool_calls: dict[int, dict] = {}
     finish_reason = None
+    reply_parts: list[str] = []
 
-    try:
-        stream = await client.chat.completions.create(
-            model=settings.openai_model,
-            messages=base_messages,
-            tools=tool_defs,
-            tool_choice="auto",
-            temperature=0.3,
-            stream=True,
-            timeout=settings.http_timeout_seconds,
-        )
-    except RateLimitError as e:
-        logger.error(f"OpenAI rate limit error: {e}")
-        yield {
-            "type": "error",
-            "message": "Rate limit exceeded. Please wait a moment and try again.",
-        }
-        return
-    except APITimeoutError as e:
-        logger.error(f"OpenAI timeout error: {e}")
-        yield {
-            "type": "error",
-            "message": "Request timeout. The service is taking too long to respond. Please try again.",
-        }
-        return
-    except APIError as e:
-        logger.error(f"OpenAI API error: {e}")
-        status_code = getattr(e, "status_code", None)
-        if status_code == 401:
+    fast_call = None
+    if settings.fast_path_enabled:
+        fast_call = await route_fast_path(messages, settings.max_streamed_locations_per_request)
+
+    if fast_call is not None:
+        logger.info("Fast path matched; skipping the tool-selection completion")
+        tool_calls[0] = fast_call
+        finish_reason = "tool_calls"
+    else:
+        try:
+            await openai_limiter.acquire()
+        except OverloadedError:
+            logger.warning("OpenAI concurrency limit reached; rejecting request")
+            counters.inc("errors_total", type="openai_overloaded")
+            yield {"type": "error", "message": BUSY_MESSAGE}
+            return
+
+        stream = None
+        first_pass_started = time.perf_counter()
+        try:
+            stream = await client.chat.completions.create(
+                model=settings.openai_model,
+                messages=base_messages,
+                tools=tool_defs,
+                tool_choice="auto",
+                temperature=0.3,
+                stream=True,
+                stream_options={"include_usage": True},
+                timeout=settings.http_timeout_seconds,
+            )
+        except RateLimitError as e:
+            logger.error(f"OpenAI rate limit error: {e}")
+            counters.inc("errors_total", type="openai_rate_limit")
             yield {
                 "type": "error",
-                "message": "Authentication failed. Please check your API key configuration.",
+                "message": "Rate limit exceeded. Please wait a moment and try again.",
             }
-        elif status_code == 429:
+            return
+        except APITimeoutError as e:
+            logger.error(f"OpenAI timeout error: {e}")
+            counters.inc("errors_total", type="openai_timeout")
             yield {
                 "type": "error",
-                "message": "Rate limit exceeded. Please wait a moment and try again.",
+                "message": "Request timeout. The service is taking too long to respond. Please try again.",
             }
-        else:
+            return
+        except APIError as e:
+            logger.error(f"OpenAI API error: {e}")
+            counters.inc("errors_total", type="openai_api")
+            status_code = getattr(e, "status_code", None)
+            if status_code == 401:
+                yield {
+                    "type": "error",
+                    "message": "Authentication failed. Please check your API key configuration.",
+                }
+            elif status_code == 429:
+                yield {
+                    "type": "error",
+                    "message": "Rate limit exceeded. Please wait a moment and try again.",
+                }
+            else:
+                yield {
+                    "type": "error",
+                    "message": f"API error: {str(e)}. Please try again later.",
+                }
+            return
+        except Exception as e:
+            logger.error(f"Unexpected error creating OpenAI stream: {e}", exc_info=True)
+            counters.inc("errors_total", type="openai_unexpected")
             yield {
                 "type": "error",
-                "message": f"API error: {str(e)}. Please try again later.",
+                "message": "An unexpected error occurred. Please try again later.",
             }
-        return
-    except Exception as e:
-        logger.error(f"Unexpected error creating OpenAI stream: {e}", exc_info=True)
-        yield {
-            "type": "error",
-            "message": "An unexpected error occurred. Please try again later.",
-        }
-        return
+            return
+        finally:
+            if stream is None:
+                openai_limiter.release()
 
-    try:
-        async for chunk in stream:
-            if not chunk.choices:
-                continue
-            choice = chunk.choices[0]
-            finish_reason = choice.finish_reason or finish_reason
-            delta = choice.delta
-            if delta.content:
-                yield {"type": "token", "value": delta.content}
-            if delta.tool_calls:
-                for call in delta.tool_calls:
-                    entry = tool_calls.setdefault(call.index, {"id": None, "name": "", "arguments": ""})
-                    if call.id:
-                        entry["id"] = call.id
-                    if call.function and call.function.name:
-                        entry["name"] = call.function.name
-                    if call.function and call.function.arguments:
-                        entry["arguments"] += call.function.arguments
-    except Exception as e:
-        logger.error(f"Error processing stream: {e}", exc_info=True)
-        yield {
-            "type": "error",
-            "message": "Error processing response stream. Please try again.",
-        }
-        return
+        finished = False
+        tool_arguments_started = None
+        try:
+            async for chunk in stream:
+                _record_usage(chunk, "first_pass")
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                finish_reason = choice.finish_reason or finish_reason
+                delta = choice.delta
+                if delta.content:
+                    counters.inc("tokens_streamed_total")
+                    reply_parts.append(delta.content)
+                    yield {"type": "token", "value": delta.content}
+                if delta.tool_calls:
+                    if tool_arguments_started is None:
+                        tool_arguments_started = time.perf_counter()
+                    for call in delta.tool_calls:
+                        entry = tool_calls.setdefault(call.index, {"id": None, "name": "", "arguments": ""})
+                        if call.id:
+                            entry["id"] = call.id
+                        if call.function and call.function.name:
+                            entry["name"] = call.function.name
+                        if call.function and call.function.arguments:
+                            entry["arguments"] += call.function.arguments
+                        if prefetcher is not None:
+                            prefetcher.feed(
+                                call.index, entry["name"], call.function.arguments if call.function else ""
+                            )
+            finished = True
+            observe_stage("llm_first_pass", time.perf_counter() - first_pass_started)
+            if tool_arguments_started is not None:
+                # Only the span in which tool arguments stream in, i.e. the
+                # window the prefetcher has to get ahead of the tool calls.
+                observe_stage("tool_arguments", time.perf_counter() - tool_arguments_started)
+        except Exception as e:
+            logger.error(f"Error processing stream: {e}", exc_info=True)
+            counters.inc("errors_total", type="stream")
+            yield {
+                "type": "error",
+                "message": "Error processing response stream. Please try again.",
+            }
+            return
+        finally:
+            _close_stream(stream, finished)
+            openai_limiter.release()
 
     if tool_calls and finish_reason == "tool_calls":
         yield {"type": "status", "message": "Gathering live weather data..."}
@@ -136,42 +287,54 @@ async def stream_chat(
             ],
         }
 
-        tool_messages = []
-        for call in tool_calls.values():
-            try:
-                result = await run_tool(call["name"], call["arguments"], settings_obj)
-                yield {"type": "status", "message": "Summarizing insights..."}
-                yield {"type": "tool", "name": call["name"], "payload": result}
-                tool_messages.append(
-                    {
-                        "role": "tool",
-                        "tool_call_id": call["id"],
-                        "content": json.dumps(result),
-                    }
-                )
-            except WeatherError as exc:
-                logger.warning(f"Weather error: {exc}")
-                error_payload = {"error": True, "message": str(exc)}
-                yield {"type": "tool", "name": call["name"], "payload": error_payload}
-                tool_messages.append(
-                    {
-                        "role": "tool",
-                        "tool_call_id": call["id"],
-                        "content": json.dumps(error_payload),
-                    }
-                )
-            except Exception as e:
-                logger.error(f"Unexpected tool error: {e}", exc_info=True)
-                error_payload = {"error": True, "message": "An unexpected error occurred while fetching weather data."}
-                yield {"type": "tool", "name": call["name"], "payload": error_payload}
-                tool_messages.append(
-                    {
+        calls = list(tool_calls.values())
+        limit = asyncio.Semaphore(max(1, settings.max_concurrent_tool_calls))
+        events: asyncio.Queue = asyncio.Queue()
+        tasks = [
+            asyncio.ensure_future(_execute_tool_call(index, call, settings_obj, limit, events))
+            for index, call in enumerate(calls)
+        ]
+        tool_messages: list[dict] = [{} for _ in calls]
+        remaining = len(calls)
+        summarizing = False
+        try:
+            while remaining:
+                index, payload, content = await events.get()
+                call = calls[index]
+                if content is not None:
+                    tool_messages[index] = {
                         "role": "tool",
                         "tool_call_id": call["id"],
-                        "content": json.dumps(error_payload),
+                        "content": content,
                     }
-                )
+                    remaining -= 1
+                    continue
+                if not summarizing and not payload.get("error"):
+                    summarizing = True
+                    yield {"type": "status", "message": "Summarizing insights..."}
+                yield {"type": "tool", "name": call["name"], "payload": RawJSON(dumps(payload))}
+        finally:
+            unfinished = [task for task in tasks if not task.done()]
+            for task in unfinished:
+                task.cancel()
+            if unfinished:
+                counters.inc("tool_calls_cancelled", len(unfinished))
+                counters.inc("follow_up_completions_avoided")
+
+        transcript.append(assistant_tool_message)
+        transcript.extend(tool_messages)
+        reply_parts = []
 
+        try:
+            await openai_limiter.acquire()
+        except OverloadedError:
+            logger.warning("OpenAI concurrency limit reached; rejecting follow-up request")
+            counters.inc("errors_total", type="openai_overloaded")
+            yield {"type": "error", "message": BUSY_MESSAGE}
+            return
+
+        follow_stream = None
+        follow_started = time.perf_counter()
         try:
             follow_stream = await client.chat.completions.create(
                 model=settings.openai_model,
@@ -180,10 +343,12 @@ async def stream_chat(
                 tool_choice="none",
                 temperature=0.3,
                 stream=True,
+                stream_options={"include_usage": True},
                 timeout=settings.http_timeout_seconds,
             )
         except RateLimitError as e:
             logger.error(f"OpenAI rate limit error in follow stream: {e}")
+            counters.inc("errors_total", type="openai_rate_limit")
             yield {
                 "type": "error",
                 "message": "Rate limit exceeded. Please wait a moment and try again.",
@@ -191,6 +356,7 @@ async def stream_chat(
             return
         except APITimeoutError as e:
             logger.error(f"OpenAI timeout error in follow stream: {e}")
+            counters.inc("errors_total", type="openai_timeout")
             yield {
                 "type": "error",
                 "message": "Request timeout. The service is taking too long to respond. Please try again.",
@@ -198,6 +364,7 @@ async def stream_chat(
             return
         except APIError as e:
             logger.error(f"OpenAI API error in follow stream: {e}")
+            counters.inc("errors_total", type="openai_api")
             yield {
                 "type": "error",
                 "message": f"API error: {str(e)}. Please try again later.",
@@ -205,26 +372,46 @@ async def stream_chat(
             return
         except Exception as e:
             logger.error(f"Unexpected error creating follow stream: {e}", exc_info=True)
+            counters.inc("errors_total", type="openai_unexpected")
             yield {
                 "type": "error",
                 "message": "An unexpected error occurred. Please try again later.",
             }
             return
+        finally:
+            if follow_stream is None:
+                openai_limiter.release()
 
+        finished = False
+        follow_tokens = 0
         try:
             async for chunk in follow_stream:
+                _record_usage(chunk, "follow_up")
                 if not chunk.choices:
                     continue
                 delta = chunk.choices[0].delta
                 if delta.content:
+                    if not follow_tokens:
+                        observe_stage("follow_up_first_token", time.perf_counter() - follow_started)
+                    follow_tokens += 1
+                    counters.inc("tokens_streamed_total")
+                    reply_parts.append(delta.content)
                     yield {"type": "token", "value": delta.content}
+            finished = True
         except Exception as e:
             logger.error(f"Error processing follow stream: {e}", exc_info=True)
+            counters.inc("errors_total", type="stream")
             yield {
                 "type": "error",
                 "message": "Error processing response stream. Please try again.",
             }
             return
+        finally:
+            _close_stream(follow_stream, finished)
+            openai_limiter.release()
+
+    if reply_parts:
+        transcript.append({"role": "assistant", "content": "".join(reply_parts)})
 
     yield {"type": "done"}
 
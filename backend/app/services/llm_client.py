@@ -1,12 +1,48 @@
-from openai import AsyncOpenAI
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 
 from app.core.config import settings
+from app.core.http import pool_stats
 
+_openai_client: AsyncOpenAI | None = None
+_openai_http_client: httpx.AsyncClient | None = None
 
-def create_openai_client() -> AsyncOpenAI:
+
+def create_openai_client(http_client: httpx.AsyncClient | None = None) -> AsyncOpenAI:
     return AsyncOpenAI(
         api_key=settings.openai_api_key,
         base_url=settings.openai_base_url,
         timeout=settings.http_timeout_seconds,
+        http_client=http_client,
+    )
+
+
+def _create_openai_http_client() -> httpx.AsyncClient:
+    return DefaultAsyncHttpxClient(
+        timeout=settings.http_timeout_seconds,
+        limits=httpx.Limits(
+            max_connections=settings.openai_max_connections,
+            max_keepalive_connections=settings.openai_max_keepalive_connections,
+            keepalive_expiry=settings.openai_keepalive_expiry_seconds,
+        ),
     )
 
+
+def get_openai_client() -> AsyncOpenAI:
+    global _openai_client, _openai_http_client
+    if _openai_client is None or _openai_http_client is None or _openai_http_client.is_closed:
+        _openai_http_client = _create_openai_http_client()
+        _openai_client = create_openai_client(_openai_http_client)
+    return _openai_client
+
+
+async def close_openai_client() -> None:
+    global _openai_client, _openai_http_client
+    if _openai_client is not None:
+        await _openai_client.close()
+    _openai_client = None
+    _openai_http_client = None
+
+
+def openai_pool_stats() -> dict:
+    return pool_stats(_openai_http_client)
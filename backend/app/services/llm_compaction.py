@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import json
+import logging
+
+from app.core.config import settings
+from app.core.constants import WEATHER_CODE_LABELS
+from app.utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+HOURLY_STEPS = (3, 6, 12)
+
+
+def _round(value, digits: int = 1):
+    if isinstance(value, float):
+        return round(value, digits)
+    return value
+
+
+def _label(code) -> str | None:
+    if code is None:
+        return None
+    return WEATHER_CODE_LABELS.get(int(code), f"code {code}")
+
+
+def _at(series: dict, field: str, index: int):
+    values = series.get(field) or []
+    return values[index] if index < len(values) else None
+
+
+def _clock(value) -> str | None:
+    if isinstance(value, str) and "T" in value:
+        return value.split("T", 1)[1]
+    return value
+
+
+def _place_name(location: dict) -> str:
+    parts = [location.get("name"), location.get("admin1"), location.get("country")]
+    return ", ".join(part for part in parts if part)
+
+
+def _compact_current(current: dict) -> dict:
+    return {
+        "time": current.get("time"),
+        "conditions": _label(current.get("weather_code")),
+        "temperature": _round(current.get("temperature_2m")),
+        "feels_like": _round(current.get("apparent_temperature")),
+        "humidity": _round(current.get("relative_humidity_2m"), 0),
+        "precipitation": _round(current.get("precipitation")),
+        "wind_speed": _round(current.get("wind_speed_10m")),
+        "wind_direction": _round(current.get("wind_direction_10m"), 0),
+    }
+
+
+def _compact_daily(daily: dict, include_sun: bool) -> list[dict]:
+    days = []
+    for index, date in enumerate(daily.get("time") or []):
+        day = {
+            "date": date,
+            "conditions": _label(_at(daily, "weather_code", index)),
+            "high": _round(_at(daily, "temperature_2m_max", index)),
+            "low": _round(_at(daily, "temperature_2m_min", index)),
+            "precipitation": _round(_at(daily, "precipitation_sum", index)),
+            "max_wind": _round(_at(daily, "wind_speed_10m_max", index)),
+        }
+        if include_sun:
+            day["sunrise"] = _clock(_at(daily, "sunrise", index))
+            day["sunset"] = _clock(_at(daily, "sunset", index))
+        days.append(day)
+    return days
+
+
+def _compact_hourly(hourly: dict, start_time: str | None, step: int) -> list[dict]:
+    times = hourly.get("time") or []
+    start = 0
+    if start_time:
+        start = next((index for index, value in enumerate(times) if value >= start_time[:13]), len(times))
+    end = min(len(times), start + settings.tool_payload_hourly_window)
+    return [
+        {
+            "time": times[index],
+            "conditions": _label(_at(hourly, "weather_code", index)),
+            "temperature": _round(_at(hourly, "temperature_2m", index)),
+            "precipitation_probability": _at(hourly, "precipitation_probability", index),
+            "wind_speed": _round(_at(hourly, "wind_speed_10m", index)),
+        }
+        for index in range(start, end, step)
+    ]
+
+
+def _compact_weather(result: dict, hourly_step: int | None, include_sun: bool) -> dict:
+    current = result.get("current") or {}
+    compact = {
+        "location": _place_name(result.get("location") or {}),
+        "timezone": (result.get("location") or {}).get("timezone"),
+        "units": result.get("units"),
+    }
+    # Projected lookups leave out the groups the question did not ask for.
+    if current:
+        compact["current"] = _compact_current(current)
+    if result.get("daily"):
+        compact["daily"] = _compact_daily(result["daily"], include_sun)
+    if hourly_step and result.get("hourly"):
+        compact["hourly"] = _compact_hourly(result.get("hourly") or {}, current.get("time"), hourly_step)
+    return compact
+
+
+def _compact(result: dict, hourly_step: int | None, include_sun: bool) -> dict:
+    if result.get("error"):
+        return result
+    if "results" in result:
+        return {
+            "results": [
+                item if item.get("error") else _compact_weather(item, hourly_step, include_sun)
+                for item in result["results"]
+            ]
+        }
+    return _compact_weather(result, hourly_step, include_sun)
+
+
+def compact_tool_result(result: dict) -> str:
+    # Large streamed batches share a capped budget so they compact harder
+    # instead of growing the follow-up prompt without bound.
+    locations = min(len(result.get("results") or []), settings.max_locations_per_request)
+    budget = settings.tool_payload_token_budget * max(1, locations)
+    full = json.dumps(result, separators=(",", ":"), ensure_ascii=False)
+    full_tokens = count_tokens(full, settings.openai_model)
+    if result.get("error"):
+        return full
+
+    attempts = [(step, True) for step in HOURLY_STEPS] + [(None, True), (None, False)]
+    for hourly_step, include_sun in attempts:
+        content = json.dumps(
+            _compact(result, hourly_step, include_sun), separators=(",", ":"), ensure_ascii=False
+        )
+        tokens = count_tokens(content, settings.openai_model)
+        if tokens <= budget:
+            break
+
+    logger.info(f"Compacted tool payload from {full_tokens} to {tokens} tokens (budget {budget})")
+    return content
+
+
+def _digest_weather(item: dict) -> str:
+    if item.get("error"):
+        return f"{item.get('location') or 'Unknown location'}: lookup failed"
+    units = item.get("units") or {}
+    degree = units.get("temperature", "")
+    current = item.get("current") or {}
+    parts = [f"{item.get('location') or 'Unknown location'}:"]
+    if current.get("temperature") is not None:
+        parts.append(f"{current['temperature']}{degree} {current.get('conditions') or ''}".strip() + " now")
+    days = [
+        f"{day.get('date')} {day.get('low')}-{day.get('high')}{degree} {day.get('conditions') or ''}".strip()
+        for day in item.get("daily") or []
+    ]
+    if days:
+        parts.append("; ".join(days))
+    return " ".join(parts)
+
+
+def digest_tool_content(content: str, max_chars: int = 400) -> str:
+    try:
+        payload = json.loads(content)
+    except (TypeError, ValueError):
+        return content[:max_chars]
+    if not isinstance(payload, dict):
+        return content[:max_chars]
+    if payload.get("error"):
+        return f"Weather lookup failed: {payload.get('message')}"
+    items = payload.get("results") if "results" in payload else [payload]
+    digest = " | ".join(_digest_weather(item) for item in items if isinstance(item, dict))
+    return digest[:max_chars]
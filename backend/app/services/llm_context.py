@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import logging
+from functools import lru_cache
+
+from app.core.config import settings
+from app.core.metrics import counters
+from app.services.llm_compaction import digest_tool_content
+from app.utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_OVERHEAD_TOKENS = 4
+NOTE_CHARS = 160
+
+
+@lru_cache(maxsize=4096)
+def _text_tokens(text: str) -> int:
+    return count_tokens(text, settings.openai_model)
+
+
+def message_tokens(message: dict) -> int:
+    tokens = MESSAGE_OVERHEAD_TOKENS + _text_tokens(message.get("content") or "")
+    for call in message.get("tool_calls") or []:
+        function = call.get("function") or {}
+        tokens += _text_tokens(function.get("name") or "") + _text_tokens(function.get("arguments") or "")
+    return tokens
+
+
+def _split_turns(messages: list[dict]) -> list[list[dict]]:
+    turns: list[list[dict]] = []
+    for message in messages:
+        if message.get("role") == "user" or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _digest_turn(turn: list[dict]) -> list[dict]:
+    digested = []
+    for message in turn:
+        if message.get("role") == "tool":
+            digest = digest_tool_content(message.get("content") or "")
+            message = {**message, "content": f"Earlier weather data (may be outdated): {digest}"}
+        digested.append(message)
+    return digested
+
+
+def _shorten(text: str) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= NOTE_CHARS else text[: NOTE_CHARS - 3].rstrip() + "..."
+
+
+@lru_cache(maxsize=2048)
+def _turn_note(user_text: str, reply_text: str, tool_digests: tuple[str, ...]) -> str:
+    note = f"User: {_shorten(user_text)}"
+    if tool_digests:
+        note += f" | Data: {_shorten(' | '.join(tool_digests))}"
+    if reply_text:
+        note += f" | Assistant: {_shorten(reply_text)}"
+    return note
+
+
+def _summarize_turn(turn: list[dict]) -> str:
+    # Notes are cached per turn, so a growing conversation only summarizes the
+    # turn that has just fallen out of the window.
+    user_text = next((m.get("content") or "" for m in turn if m.get("role") == "user"), "")
+    replies = [m.get("content") or "" for m in turn if m.get("role") == "assistant" and m.get("content")]
+    digests = tuple(
+        digest_tool_content(m.get("content") or "", NOTE_CHARS) for m in turn if m.get("role") == "tool"
+    )
+    return _turn_note(user_text, replies[-1] if replies else "", digests)
+
+
+def _summary_message(turns: list[list[dict]]) -> dict | None:
+    notes: list[str] = []
+    used = 0
+    for turn in reversed(turns):
+        note = _summarize_turn(turn)
+        tokens = _text_tokens(note)
+        if used + tokens > settings.context_summary_token_budget:
+            break
+        notes.append(note)
+        used += tokens
+    if not notes:
+        return None
+    lines = "\n".join(f"- {note}" for note in reversed(notes))
+    return {"role": "system", "content": f"Summary of the earlier conversation:\n{lines}"}
+
+
+def window_messages(messages: list[dict]) -> list[dict]:
+    # Only the leading system messages are pinned; ones the client placed later
+    # stay where they are, inside their turn.
+    pinned = 0
+    while pinned < len(messages) and messages[pinned].get("role") == "system":
+        pinned += 1
+    system = messages[:pinned]
+    turns = _split_turns(messages[pinned:])
+    if not turns:
+        return messages
+
+    budget = (
+        settings.context_token_budget
+        - settings.context_summary_token_budget
+        - sum(message_tokens(message) for message in system)
+    )
+    kept: list[list[dict]] = []
+    used = 0
+    for position, turn in enumerate(reversed(turns)):
+        # Weather results from earlier turns are stale; keep only a digest.
+        candidate = turn if position == 0 else _digest_turn(turn)
+        tokens = sum(message_tokens(message) for message in candidate)
+        if kept and used + tokens > budget:
+            break
+        kept.append(candidate)
+        used += tokens
+    kept.reverse()
+    dropped = turns[: len(turns) - len(kept)]
+
+    windowed = list(system)
+    if dropped:
+        summary = _summary_message(dropped)
+        if summary is not None:
+            windowed.append(summary)
+        # Instructions from summarized turns still apply, so they are kept.
+        windowed.extend(message for turn in dropped for message in turn if message.get("role") == "system")
+    for turn in kept:
+        windowed.extend(turn)
+
+    if len(turns) > 1:
+        before = sum(message_tokens(message) for message in messages)
+        after = sum(message_tokens(message) for message in windowed)
+        if after < before:
+            counters.inc("context_tokens_saved", before - after)
+            logger.info(
+                f"Context windowed from {before} to {after} tokens "
+                f"({len(dropped)} of {len(turns)} turns summarized)"
+            )
+    return windowed
@@ -1,14 +1,29 @@
+from functools import lru_cache
+
 from app.schemas.chat import ChatSettings
 
+# The static prompt is sent first and never varies between users or turns so the
+# provider's prompt cache can reuse it; per-request preferences follow it.
+SYSTEM_PROMPT = (
+    "You are a conversational weather assistant. "
+    "Keep answers friendly, concise, and actionable. "
+    "Use the get_weather tool whenever the user asks about conditions, forecasts, or comparisons. "
+    "Always reply in Markdown. "
+    "When you respond, include a quick summary, then short bullet insights, then a suggested next question."
+)
+UNIT_HINTS = {
+    "metric": "Celsius, km/h, mm",
+    "imperial": "Fahrenheit, mph, inches",
+}
+
 
-def build_system_prompt(settings_obj: ChatSettings) -> str:
-    unit_hint = "Celsius, km/h, mm" if settings_obj.units == "metric" else "Fahrenheit, mph, inches"
+@lru_cache(maxsize=None)
+def _system_messages(units: str) -> tuple[dict, dict]:
     return (
-        "You are a conversational weather assistant. "
-        "Keep answers friendly, concise, and actionable. "
-        "Use the get_weather tool whenever the user asks about conditions, forecasts, or comparisons. "
-        f"Use these preferred units: {unit_hint}. "
-        "Always reply in Markdown. "
-        "When you respond, include a quick summary, then short bullet insights, then a suggested next question."
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "system", "content": f"Use these preferred units: {UNIT_HINTS.get(units, UNIT_HINTS['metric'])}."},
     )
 
+
+def system_messages(settings_obj: ChatSettings) -> list[dict]:
+    return list(_system_messages(settings_obj.units))
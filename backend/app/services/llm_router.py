@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import re
+import uuid
+
+from app.core.http import get_http_client
+from app.schemas.chat import ChatMessage
+from app.services.weather import WeatherError, geocode_location
+
+logger = logging.getLogger(__name__)
+
+SINGLE_LOCATION_PATTERNS = [
+    re.compile(
+        r"^(?:what(?:['’]?s| is)|how(?:['’]?s| is))\s+(?:the\s+)?(?:weather|forecast)(?:\s+like)?\s+(?:in|for|at)\s+(?P<location>.+)$",
+        re.IGNORECASE,
+    ),
+    re.compile(r"^(?:current\s+)?(?:weather|forecast)\s+(?:in|for|at)\s+(?P<location>.+)$", re.IGNORECASE),
+]
+COMPARE_PATTERN = re.compile(
+    r"^compare\s+(?:the\s+)?(?:weather|forecasts?)?\s*(?:in|for|between|of)?\s*(?P<locations>.+)$",
+    re.IGNORECASE,
+)
+COMPARE_SEPARATOR = re.compile(r"\s*(?:;|\band\b|\bvs\.?|\bversus\b|&|\bwith\b)\s*", re.IGNORECASE)
+TRAILING_TIME = re.compile(
+    r"\s+(?:right\s+now|now|today|tonight|tomorrow|this\s+(?:morning|afternoon|evening|week|weekend))$",
+    re.IGNORECASE,
+)
+AMBIGUOUS_WORDS = re.compile(
+    r"\b(?:should|would|could|if|when|why|which|better|jacket|umbrella|wear|my|me|here|there|it"
+    r"|weather|forecast|weekend|rain|snow|temperature)\b",
+    re.IGNORECASE,
+)
+# Time, unit and generic words that geocode to real (but wrong) places, e.g.
+# "Morning" or "Home"; queries about them are left to the model.
+NON_LOCATION_WORDS = re.compile(
+    r"\b(?:today|tomorrow|tonight|yesterday|now|morning|afternoon|evening|night|day|week|weekend|month|year"
+    r"|next|later|home|beach|office|work|outside|celsius|fahrenheit|kelvin|metric|imperial|units?|degrees?)\b",
+    re.IGNORECASE,
+)
+# A second preposition means a qualifier is attached ("tonight in Boston",
+# "Paris in fahrenheit") rather than a bare place name.
+EMBEDDED_PREPOSITION = re.compile(r"\s(?:in|at|for|on|during|over|by)\s", re.IGNORECASE)
+TRAILING_LIKE = re.compile(r"\s+like$", re.IGNORECASE)
+MAX_LOCATION_LENGTH = 60
+
+
+def _clean_location(text: str) -> str | None:
+    location = TRAILING_LIKE.sub("", text.strip(" ?!."))
+    location = TRAILING_TIME.sub("", location).strip(" ?!.")
+    location = re.sub(r"^the\s+", "", location, flags=re.IGNORECASE)
+    if not location or len(location) > MAX_LOCATION_LENGTH or any(char.isdigit() for char in location):
+        return None
+    # A comma or list word may be a qualifier ("Paris, France") or another
+    # place ("Tokyo, Osaka"); the model tells those apart, the router can't.
+    if "," in location or COMPARE_SEPARATOR.search(location):
+        return None
+    if AMBIGUOUS_WORDS.search(location) or NON_LOCATION_WORDS.search(location):
+        return None
+    if EMBEDDED_PREPOSITION.search(location):
+        return None
+    return location
+
+
+def match_weather_query(text: str) -> list[str] | None:
+    query = re.sub(r"\s+", " ", text.strip()).rstrip(" ?!.")
+    if not query or "\n" in text.strip():
+        return None
+
+    match = COMPARE_PATTERN.match(query)
+    if match:
+        parts = COMPARE_SEPARATOR.split(match.group("locations"))
+        if len(parts) < 2:
+            return None
+        locations = [_clean_location(part) for part in parts]
+        if any(location is None for location in locations):
+            return None
+        return locations
+
+    for pattern in SINGLE_LOCATION_PATTERNS:
+        match = pattern.match(query)
+        if match:
+            location = _clean_location(match.group("location"))
+            return [location] if location else None
+    return None
+
+
+async def route_fast_path(messages: list[ChatMessage], max_locations: int) -> dict | None:
+    if not messages or messages[-1].role != "user":
+        return None
+    locations = match_weather_query(messages[-1].content)
+    if not locations or len(locations) > max_locations:
+        return None
+
+    client = get_http_client()
+    try:
+        await asyncio.gather(*(geocode_location(client, location) for location in locations))
+    except WeatherError as exc:
+        logger.info(f"Fast path declined, falling back to the model: {exc}")
+        return None
+
+    arguments = {"location": locations[0]} if len(locations) == 1 else {"locations": locations}
+    return {
+        "id": f"call_{uuid.uuid4().hex[:24]}",
+        "name": "get_weather",
+        "arguments": json.dumps(arguments),
+    }
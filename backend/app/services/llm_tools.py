@@ -1,57 +1,156 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import re
+from collections.abc import AsyncGenerator
+from contextlib import aclosing
 
+from app.core.config import settings
+from app.core.constants import DETAIL_GROUPS
 from app.schemas.chat import ChatSettings
-from app.services.weather import WeatherError, fetch_weather, fetch_weather_batch
+from app.services.weather import WeatherError, fetch_weather, prefetch_weather, stream_weather_batch
+from app.utils.partial_json import PartialArguments, complete_string_values
+from app.utils.weather_utils import normalize_location
 
+DAYS_ARGUMENT = re.compile(r'"days"\s*:\s*(\d+)\s*[,}]')
 
-def tool_definitions() -> list[dict]:
-    return [
-        {
-            "type": "function",
-            "function": {
-                "name": "get_weather",
-                "description": "Get current conditions and 3-day forecast for one or more cities.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "location": {
-                            "type": "string",
-                            "description": "City or place name, e.g. 'Seattle' or 'Paris, France'.",
-                        },
-                        "locations": {
-                            "type": "array",
-                            "items": {"type": "string"},
-                            "description": "List of city or place names for comparisons.",
-                        },
-                        "units": {
-                            "type": "string",
-                            "enum": ["metric", "imperial"],
-                            "description": "Units for temperature and wind speed.",
-                        },
+TOOL_DEFINITIONS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "get_weather",
+            "description": (
+                "Get current conditions and forecast for one or more cities. "
+                "Ask only for the detail the question needs."
+            ),
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "detail": {
+                        "type": "string",
+                        "enum": list(DETAIL_GROUPS),
+                        "description": (
+                            "'current' for conditions right now, 'daily' for day-level highs/lows, "
+                            "'hourly' for hour-by-hour timing, 'full' when unsure."
+                        ),
+                    },
+                    "days": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "Number of forecast days needed, starting today.",
+                    },
+                    "location": {
+                        "type": "string",
+                        "description": "City or place name, e.g. 'Seattle' or 'Paris, France'.",
+                    },
+                    "locations": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "List of city or place names for comparisons.",
+                    },
+                    "units": {
+                        "type": "string",
+                        "enum": ["metric", "imperial"],
+                        "description": "Units for temperature and wind speed.",
                     },
-                    "required": [],
                 },
+                "required": [],
             },
-        }
-    ]
+        },
+    }
+]
+
 
+def tool_definitions() -> list[dict]:
+    return TOOL_DEFINITIONS
 
-async def run_tool(name: str, arguments: str, settings_obj: ChatSettings) -> dict:
+
+async def stream_tool(
+    name: str, arguments: str, settings_obj: ChatSettings
+) -> AsyncGenerator[tuple[int, dict], None]:
+    # Yields (location index, result) so multi-location lookups reach the
+    # client one place at a time.
     payload = json.loads(arguments) if arguments else {}
-    if name == "get_weather":
-        locations = payload.get("locations") or []
-        location = payload.get("location", "")
-        units = payload.get("units", settings_obj.units)
-        if location:
-            locations = [location, *locations]
-        locations = [item for item in locations if item]
-        if not locations:
-            raise WeatherError("Please provide a location to look up weather.")
-        if len(locations) == 1:
-            return await fetch_weather(locations[0], units)
-        results = await fetch_weather_batch(locations, units)
-        return {"results": results}
-    raise WeatherError(f"Unknown tool '{name}'.")
+    if name != "get_weather":
+        raise WeatherError(f"Unknown tool '{name}'.")
+    locations = payload.get("locations") or []
+    location = payload.get("location", "")
+    units = payload.get("units", settings_obj.units)
+    detail = payload.get("detail") or "full"
+    if detail not in DETAIL_GROUPS:
+        raise WeatherError(f"Unknown detail level '{detail}'.")
+    days = payload.get("days")
+    if days is not None and (isinstance(days, bool) or not isinstance(days, int) or days < 1):
+        raise WeatherError("Days must be a positive whole number.")
+    if location:
+        locations = [location, *locations]
+    locations = [item for item in locations if item]
+    if not locations:
+        raise WeatherError("Please provide a location to look up weather.")
+    if len(locations) == 1:
+        yield 0, await fetch_weather(locations[0], units, detail, days)
+        return
+    async with aclosing(stream_weather_batch(locations, units, detail, days)) as results:
+        async for item in results:
+            yield item
+
+
+class ToolPrefetcher:
+    def __init__(self) -> None:
+        self._arguments: dict[int, PartialArguments] = {}
+        self._locations: dict[int, list[str]] = {}
+        self._started: set[str] = set()
+        self._queued: dict[tuple[str | None, int | None, bool], list[str]] = {}
+        self._running: asyncio.Task | None = None
+        self._cancelled = False
+        self.tasks: list[asyncio.Task] = []
+
+    def feed(self, index: int, name: str, fragment: str) -> None:
+        arguments = self._arguments.setdefault(index, PartialArguments("location", "locations"))
+        locations = self._locations.setdefault(index, [])
+        if fragment:
+            locations.extend(arguments.feed(fragment))
+        if name != "get_weather":
+            return
+        # A list of places is geocoded ahead but its forecasts are left to the
+        # tool call, which fetches them in one request instead of one per
+        # prefetch batch.
+        forecasts = '"locations"' not in arguments.text
+        projection = (*self._projection(arguments.text), forecasts)
+        for location in locations:
+            # Past the regular batch size the streamed batch fetches in shared
+            # chunks, which costs fewer upstream requests than prefetching.
+            if len(self._started) >= settings.max_locations_per_request:
+                break
+            key = normalize_location(location)
+            if not key or key in self._started:
+                continue
+            self._started.add(key)
+            self._queued.setdefault(projection, []).append(location)
+        locations.clear()
+        self._flush()
+
+    @staticmethod
+    def _projection(text: str) -> tuple[str | None, int | None]:
+        # The schema lists detail and days before the locations so they are
+        # usually known by now; without them the full forecast is the safe
+        # superset to prefetch.
+        details = [value for value in complete_string_values(text, "detail") if value in DETAIL_GROUPS]
+        days = DAYS_ARGUMENT.search(text)
+        return (details[0] if details else None), (int(days.group(1)) if days else None)
+
+    def _flush(self, _: asyncio.Task | None = None) -> None:
+        # One batched prefetch runs at a time; locations parsed meanwhile are
+        # queued and go out together in the next batch.
+        if self._cancelled or not self._queued or (self._running is not None and not self._running.done()):
+            return
+        (detail, days, forecasts), locations = self._queued.popitem()
+        self._running = prefetch_weather(locations, detail, days, forecasts)
+        self._running.add_done_callback(self._flush)
+        self.tasks.append(self._running)
 
+    def cancel(self) -> None:
+        self._cancelled = True
+        for task in self.tasks:
+            task.cancel()
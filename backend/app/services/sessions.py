@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+
+from app.core.config import settings
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class SessionError(Exception):
+    pass
+
+
+class SessionBackend(ABC):
+    @abstractmethod
+    def load(self, session_id: str) -> list[dict] | None: ...
+
+    @abstractmethod
+    def save(self, session_id: str, messages: list[dict], ttl: float) -> None: ...
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None: ...
+
+
+class SqliteSessionBackend(SessionBackend):
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions "
+                "(id TEXT PRIMARY KEY, messages TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5.0)
+
+    def load(self, session_id: str) -> list[dict] | None:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT messages FROM sessions WHERE id = ? AND expires_at > ?", (session_id, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, session_id: str, messages: list[dict], ttl: float) -> None:
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO sessions (id, messages, expires_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(messages), time.time() + ttl),
+            )
+            connection.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, session_id: str) -> None:
+        with self._connect() as connection:
+            connection.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+
+def trim_history(messages: list[dict], max_messages: int) -> list[dict]:
+    if len(messages) <= max_messages:
+        return messages
+    start = len(messages) - max_messages
+    # Cut at a user turn so tool results never lose the assistant call they answer.
+    while start < len(messages) and messages[start].get("role") != "user":
+        start += 1
+    return messages[start:]
+
+
+class SessionStore:
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        max_messages: int,
+        backend: SessionBackend | None = None,
+        turn_lease: float = 300.0,
+    ) -> None:
+        self.ttl = ttl
+        self.max_messages = max_messages
+        self.backend = backend
+        self.turn_lease = turn_lease
+        self._cache = TTLCache(maxsize, ttl)
+        # session id -> (lease token, expiry); an expired lease no longer blocks
+        # the session even if its stream never ran its cleanup.
+        self._active: dict[str, tuple[str, float]] = {}
+
+    def create(self) -> str:
+        session_id = uuid.uuid4().hex
+        self._cache.set(session_id, [])
+        return session_id
+
+    async def load(self, session_id: str) -> list[dict] | None:
+        if self.backend is not None:
+            # Other workers save to the same backend, so it is read first; the
+            # local copy only covers sessions created here and not yet saved,
+            # or a backend that can't be read.
+            try:
+                messages = await asyncio.to_thread(self.backend.load, session_id)
+            except Exception as exc:
+                logger.error(f"Failed to load session {session_id}: {exc}")
+                messages = None
+            if messages is not None:
+                self._cache.set(session_id, messages)
+                return messages
+        return self._cache.get(session_id)
+
+    async def save(self, session_id: str, messages: list[dict]) -> None:
+        messages = trim_history(messages, self.max_messages)
+        self._cache.set(session_id, messages)
+        if self.backend is not None:
+            try:
+                await asyncio.to_thread(self.backend.save, session_id, messages, self.ttl)
+            except Exception as exc:
+                logger.error(f"Failed to persist session {session_id}: {exc}")
+
+    def begin_turn(self, session_id: str) -> str:
+        now = time.monotonic()
+        lease = self._active.get(session_id)
+        if lease is not None and lease[1] > now:
+            raise SessionError("A reply is already being generated for this session.")
+        token = uuid.uuid4().hex
+        self._active[session_id] = (token, now + self.turn_lease)
+        return token
+
+    def end_turn(self, session_id: str, token: str) -> None:
+        lease = self._active.get(session_id)
+        if lease is not None and lease[0] == token:
+            del self._active[session_id]
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        active = sum(1 for _, expires_at in self._active.values() if expires_at > now)
+        return {**self._cache.stats(), "active": active, "persistent": self.backend is not None}
+
+
+def _create_store() -> SessionStore:
+    backend = SqliteSessionBackend(settings.session_db_path) if settings.session_db_path else None
+    return SessionStore(
+        settings.session_store_size,
+        settings.session_ttl_seconds,
+        settings.session_max_messages,
+        backend,
+        settings.session_turn_lease_seconds,
+    )
+
+
+session_store = _create_store()
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+
+from app.core.config import settings
+from app.services.weather import extend_popular_forecasts, refresh_popular_forecasts
+from app.utils.weather_utils import forecast_ttl
+
+logger = logging.getLogger(__name__)
+
+_warmer_task: asyncio.Task | None = None
+
+
+async def _run_warmer() -> None:
+    update_interval = settings.forecast_cache_ttl_seconds
+    lead = settings.forecast_warmer_refresh_ahead_seconds
+    jitter = settings.forecast_warmer_jitter_seconds
+    while True:
+        # Forecast entries expire together at each upstream update boundary.
+        # Shortly before it, extend the popular ones; just after it (jittered so
+        # workers don't stampede), fetch the new data for them in batches.
+        until_boundary = forecast_ttl(update_interval)
+        if until_boundary > lead:
+            await asyncio.sleep(until_boundary - lead)
+            until_boundary = forecast_ttl(update_interval)
+        extended = extend_popular_forecasts(until_boundary + jitter + lead)
+        await asyncio.sleep(until_boundary + random.uniform(0, jitter))
+        try:
+            refreshed = await refresh_popular_forecasts(
+                lead + jitter + 1.0, settings.forecast_warmer_requests_per_second, extended
+            )
+            logger.info(f"Forecast warmer extended {len(extended)} and refreshed {refreshed} popular forecasts")
+        except Exception as exc:
+            logger.error(f"Forecast warmer cycle failed: {exc}", exc_info=True)
+        # Step past the boundary just handled before computing the next one.
+        await asyncio.sleep(1.0)
+
+
+def start_forecast_warmer() -> None:
+    global _warmer_task
+    if not settings.forecast_warmer_enabled or settings.forecast_cache_ttl_seconds <= 0:
+        return
+    if _warmer_task is None or _warmer_task.done():
+        _warmer_task = asyncio.create_task(_run_warmer())
+
+
+async def stop_forecast_warmer() -> None:
+    global _warmer_task
+    if _warmer_task is None:
+        return
+    _warmer_task.cancel()
+    try:
+        await _warmer_task
+    except asyncio.CancelledError:
+        pass
+    _warmer_task = None
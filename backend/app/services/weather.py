@@ -2,187 +2,698 @@ from __future__ import annotations
 
 import asyncio
 import logging
+from collections.abc import AsyncGenerator
 
 import httpx
 
+from app.core.concurrency import Limiter, OverloadedError, forecast_limiter, geocode_limiter
 from app.core.config import settings
-from app.core.constants import DEFAULT_FORECAST_DAYS, FORECAST_API_URL, GEOCODE_API_URL
-from app.core.http import create_http_client
-from app.utils.weather_utils import candidate_locations, units_params
+from app.core.constants import (
+    CURRENT_VARIABLES,
+    DAILY_VARIABLES,
+    DEFAULT_FORECAST_DAYS,
+    DETAIL_GROUPS,
+    HOURLY_VARIABLES,
+)
+from app.core.http import get_http_client
+from app.core.metrics import counters, span
+from app.core.resilience import CircuitOpenError, ResilientUpstream
+from app.utils.cache import TTLCache
+from app.utils.gazetteer import Gazetteer
+from app.utils.popularity import DecayedTopN
+from app.utils.forecast_model import Forecast
+from app.utils.shared_cache import Codec, TieredCache, create_cache
+from app.utils.singleflight import SingleFlight, wait_shared
+from app.utils.weather_utils import (
+    METRIC_UNITS_PARAMS,
+    candidate_locations,
+    convert_block,
+    forecast_ttl,
+    normalize_location,
+    unit_labels,
+)
 
 logger = logging.getLogger(__name__)
 
 
+BUSY_MESSAGE = "The weather service is busy right now. Please try again in a moment."
+UNAVAILABLE_MESSAGE = "Weather service is temporarily unavailable. Please try again later."
+GEOCODE_FAILED_MESSAGE = "The location lookup failed. Please try again in a moment."
+
+
 class WeatherError(RuntimeError):
     pass
 
 
+class LocationNotFoundError(WeatherError):
+    pass
+
+
+def _cache(
+    namespace: str, maxsize: int, ttl: float, stale_ttl: float = 0.0, codec: Codec | None = None
+) -> TTLCache | TieredCache:
+    return create_cache(
+        namespace,
+        maxsize,
+        ttl,
+        stale_ttl,
+        backend=settings.cache_backend,
+        path=settings.cache_sqlite_path,
+        codec=codec,
+    )
+
+
+_geocode_cache = _cache("geocode", settings.geocode_cache_size, settings.geocode_cache_ttl_seconds)
+_geocode_misses = _cache("geocode_negative", settings.geocode_cache_size, settings.geocode_negative_ttl_seconds)
+_forecast_cache = _cache(
+    "forecast",
+    settings.forecast_cache_size,
+    settings.forecast_cache_ttl_seconds,
+    settings.forecast_stale_ttl_seconds,
+    codec=(Forecast.to_dict, Forecast.from_dict),
+)
+_geocode_flights = SingleFlight()
+_popularity = DecayedTopN(settings.popularity_capacity, settings.popularity_half_life_seconds)
+
+
+def _upstream(name: str, limiter: Limiter) -> ResilientUpstream:
+    return ResilientUpstream(
+        name,
+        max_retries=settings.upstream_max_retries,
+        retry_base_delay=settings.upstream_retry_base_delay_seconds,
+        retry_max_delay=settings.upstream_retry_max_delay_seconds,
+        failure_threshold=settings.circuit_breaker_failure_threshold,
+        reset_timeout_seconds=settings.circuit_breaker_reset_seconds,
+        hedge_enabled=settings.hedged_requests_enabled,
+        hedge_percentile=settings.hedge_latency_percentile,
+        limiter=limiter,
+        deadline_seconds=settings.upstream_deadline_seconds,
+    )
+
+
+_geocode_upstream = _upstream("geocoding API", geocode_limiter)
+_forecast_upstream = _upstream("forecast API", forecast_limiter)
+_forecast_flights = SingleFlight()
+
+
+_gazetteer: Gazetteer | None = None
+_gazetteer_failed = False
+
+
+def get_gazetteer() -> Gazetteer | None:
+    global _gazetteer, _gazetteer_failed
+    if _gazetteer is None and settings.gazetteer_path and not _gazetteer_failed:
+        try:
+            _gazetteer = Gazetteer(settings.gazetteer_path)
+            logger.info(f"Loaded offline gazetteer with {len(_gazetteer)} places")
+        except (OSError, ValueError) as exc:
+            _gazetteer_failed = True
+            logger.error(f"Could not load gazetteer from {settings.gazetteer_path}: {exc}")
+    return _gazetteer
+
+
+def _local_geocode(location: str, prefix: bool = False) -> dict | None:
+    gazetteer = get_gazetteer()
+    if gazetteer is None:
+        return None
+    place = gazetteer.lookup(location, prefix)
+    counters.inc("geocode_local_lookups", result="hit" if place else "miss", match="prefix" if prefix else "exact")
+    return place
+
+
+async def _geocode_candidate(client: httpx.AsyncClient, name: str, country: str | None) -> dict | None:
+    try:
+        response = await _geocode_upstream.get(
+            client,
+            settings.geocode_api_url,
+            params={
+                "name": name,
+                "count": 3,
+                "language": "en",
+                "format": "json",
+                "country": country,
+            },
+            timeout=settings.http_timeout_seconds,
+        )
+        response.raise_for_status()
+        payload = response.json()
+        if not isinstance(payload, dict):
+            logger.warning(f"Invalid geocode response format for '{name}'")
+            raise WeatherError(GEOCODE_FAILED_MESSAGE)
+        results = payload.get("results") or []
+        if results and isinstance(results, list) and len(results) > 0:
+            result = results[0]
+            if not isinstance(result, dict) or "latitude" not in result or "longitude" not in result:
+                logger.warning(f"Invalid geocode result format for '{name}'")
+                raise WeatherError(GEOCODE_FAILED_MESSAGE)
+            return result
+        # Only a well-formed empty answer means the place does not exist;
+        # every failure below raises so it is never cached as a miss.
+        return None
+    except WeatherError:
+        raise
+    except httpx.TimeoutException:
+        logger.warning(f"Geocode timeout for '{name}'")
+        raise WeatherError("Request timeout. The geocoding service is taking too long to respond.")
+    except httpx.HTTPStatusError as e:
+        logger.warning(f"Geocode HTTP error for '{name}': {e.response.status_code}")
+        if e.response.status_code >= 500:
+            raise WeatherError("Weather service is temporarily unavailable. Please try again later.")
+        raise WeatherError(GEOCODE_FAILED_MESSAGE)
+    except OverloadedError:
+        logger.warning(f"Geocode queue full for '{name}'")
+        raise WeatherError(BUSY_MESSAGE)
+    except CircuitOpenError:
+        logger.warning(f"Geocode circuit open; skipping lookup for '{name}'")
+        raise WeatherError(UNAVAILABLE_MESSAGE)
+    except httpx.RequestError as e:
+        logger.error(f"Geocode request error for '{name}': {e}")
+        raise WeatherError("Unable to connect to geocoding service. Please check your internet connection.")
+    except Exception as e:
+        logger.error(f"Unexpected geocode error for '{name}': {e}", exc_info=True)
+        raise WeatherError(GEOCODE_FAILED_MESSAGE)
+
+
 async def geocode_location(client: httpx.AsyncClient, location: str) -> dict:
     if not location or not location.strip():
         raise WeatherError("Location cannot be empty.")
 
-    for name, country in candidate_locations(location):
-        try:
-            response = await client.get(
-                GEOCODE_API_URL,
-                params={
-                    "name": name,
-                    "count": 3,
-                    "language": "en",
-                    "format": "json",
-                    "country": country,
-                },
-            timeout=settings.http_timeout_seconds,
-            )
-            response.raise_for_status()
-            payload = response.json()
-            if not isinstance(payload, dict):
-                logger.warning(f"Invalid geocode response format for '{name}'")
+    key = normalize_location(location)
+    cached = _geocode_cache.get(key)
+    if cached is not None:
+        return cached
+    local = _local_geocode(location)
+    if local is not None:
+        return local
+    not_found_message = f"Could not find coordinates for '{location}'. Please check the spelling and try again."
+    if key in _geocode_misses:
+        raise LocationNotFoundError(not_found_message)
+
+    try:
+        return await _geocode_flights.run(key, lambda: _resolve_location(client, location, key))
+    except LocationNotFoundError:
+        raise
+    except WeatherError:
+        # A close local name beats an error while the remote geocoder is down.
+        fallback = _local_geocode(location, prefix=True)
+        if fallback is None:
+            raise
+        logger.info(f"Geocoder unavailable; using local prefix match {fallback['name']!r} for '{location}'")
+        return fallback
+
+
+async def _resolve_location(client: httpx.AsyncClient, location: str, key: str) -> dict:
+    with span("geocode"):
+        return await _race_candidates(client, location, key)
+
+
+async def _race_candidates(client: httpx.AsyncClient, location: str, key: str) -> dict:
+    tasks = [
+        asyncio.ensure_future(_geocode_candidate(client, name, country))
+        for name, country in candidate_locations(location)
+    ]
+    failure: WeatherError | None = None
+    try:
+        for task in tasks:
+            try:
+                result = await task
+            except WeatherError as exc:
+                failure = failure or exc
                 continue
-            results = payload.get("results") or []
-            if results and isinstance(results, list) and len(results) > 0:
-                result = results[0]
-                if not isinstance(result, dict) or "latitude" not in result or "longitude" not in result:
-                    logger.warning(f"Invalid geocode result format for '{name}'")
-                    continue
+            if result is not None:
+                _geocode_cache.set(key, result)
                 return result
-        except httpx.TimeoutException:
-            logger.warning(f"Geocode timeout for '{name}'")
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()
+
+    if failure is not None:
+        raise failure
+    _geocode_misses.set(key, True)
+    raise LocationNotFoundError(f"Could not find coordinates for '{location}'. Please check the spelling and try again.")
+
+
+def _grid_point(latitude: float, longitude: float) -> tuple[float, float]:
+    precision = settings.forecast_grid_precision
+    return round(latitude, precision), round(longitude, precision)
+
+
+def _forecast_key(latitude: float, longitude: float, forecast_days: int, groups: tuple[str, ...]) -> str:
+    precision = settings.forecast_grid_precision
+    return f"{latitude:.{precision}f},{longitude:.{precision}f}|{forecast_days}|{'+'.join(groups)}"
+
+
+def _max_forecast_days() -> int:
+    return settings.forecast_days or DEFAULT_FORECAST_DAYS
+
+
+def resolve_projection(detail: str | None, days: int | None) -> tuple[tuple[str, ...], int]:
+    groups = DETAIL_GROUPS.get(detail or "full", DETAIL_GROUPS["full"])
+    max_days = _max_forecast_days()
+    days = max_days if days is None else max(1, min(int(days), max_days))
+    return groups, days
+
+
+def _fetch_days(groups: tuple[str, ...], days: int) -> int:
+    # Current conditions don't depend on the forecast length, so fetch the minimum.
+    return days if "hourly" in groups or "daily" in groups else 1
+
+
+def _superset_variants(groups: tuple[str, ...], days: int) -> list[tuple[tuple[str, ...], int]]:
+    variants = []
+    for candidate in DETAIL_GROUPS.values():
+        if candidate == groups or not set(groups) <= set(candidate):
             continue
-        except httpx.HTTPStatusError as e:
-            logger.warning(f"Geocode HTTP error for '{name}': {e.response.status_code}")
-            if e.response.status_code >= 500:
-                raise WeatherError("Weather service is temporarily unavailable. Please try again later.")
+        first_day = _fetch_days(groups, days) if _fetch_days(candidate, days) > 1 else 1
+        variants.extend((candidate, candidate_days) for candidate_days in range(first_day, _max_forecast_days() + 1))
+    variants.extend(
+        (groups, candidate_days) for candidate_days in range(_fetch_days(groups, days) + 1, _max_forecast_days() + 1)
+    )
+    return variants
+
+
+def _forecast_error(exc: Exception, label: str) -> WeatherError:
+    if isinstance(exc, WeatherError):
+        return exc
+    if isinstance(exc, OverloadedError):
+        logger.warning(f"Forecast queue full for '{label}'")
+        return WeatherError(BUSY_MESSAGE)
+    if isinstance(exc, CircuitOpenError):
+        logger.warning(f"Forecast circuit open; failing fast for '{label}'")
+        return WeatherError(UNAVAILABLE_MESSAGE)
+    if isinstance(exc, httpx.TimeoutException):
+        logger.error(f"Weather fetch timeout for '{label}'")
+        return WeatherError("Request timeout. The weather service is taking too long to respond.")
+    if isinstance(exc, httpx.HTTPStatusError):
+        logger.error(f"Weather HTTP error for '{label}': {exc.response.status_code}")
+        if exc.response.status_code >= 500:
+            return WeatherError("Weather service is temporarily unavailable. Please try again later.")
+        return WeatherError(f"Failed to fetch weather data. Status: {exc.response.status_code}")
+    if isinstance(exc, httpx.RequestError):
+        logger.error(f"Weather request error for '{label}': {exc}")
+        return WeatherError("Unable to connect to weather service. Please check your internet connection.")
+    logger.error(f"Unexpected weather fetch error for '{label}': {exc}", exc_info=exc)
+    return WeatherError("An unexpected error occurred while fetching weather data.")
+
+
+GROUP_VARIABLES = {"current": CURRENT_VARIABLES, "hourly": HOURLY_VARIABLES, "daily": DAILY_VARIABLES}
+
+
+async def _request_forecasts(
+    client: httpx.AsyncClient, points: list[tuple[float, float]], forecast_days: int, groups: tuple[str, ...]
+) -> list[dict]:
+    params = {
+        "latitude": ",".join(str(latitude) for latitude, _ in points),
+        "longitude": ",".join(str(longitude) for _, longitude in points),
+        **{group: ",".join(GROUP_VARIABLES[group]) for group in groups},
+        "forecast_days": forecast_days,
+        "timezone": "auto",
+        **METRIC_UNITS_PARAMS,
+    }
+    with span("forecast"):
+        response = await _forecast_upstream.get(
+            client, settings.forecast_api_url, params=params, timeout=settings.http_timeout_seconds
+        )
+    response.raise_for_status()
+    data = response.json()
+
+    if isinstance(data, dict):
+        if "error" in data:
+            error_msg = data.get("reason", "Unknown error from weather service.")
+            raise WeatherError(f"Weather service error: {error_msg}")
+        data = [data]
+
+    if (
+        not isinstance(data, list)
+        or len(data) != len(points)
+        or not all(isinstance(item, dict) for item in data)
+    ):
+        raise WeatherError("Invalid response format from weather service.")
+
+    return data
+
+
+async def _load_forecast_chunk(
+    client: httpx.AsyncClient,
+    keys: list[str],
+    points: list[tuple[float, float]],
+    forecast_days: int,
+    groups: tuple[str, ...],
+) -> list[Forecast]:
+    forecasts = [
+        Forecast.from_dict(data) for data in await _request_forecasts(client, points, forecast_days, groups)
+    ]
+    ttl = forecast_ttl(settings.forecast_cache_ttl_seconds)
+    for key, data in zip(keys, forecasts):
+        _forecast_cache.set(key, data, ttl=ttl)
+    return forecasts
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    if not future.cancelled():
+        future.exception()
+
+
+async def _pick(chunk: asyncio.Future, index: int, waiters: dict[asyncio.Future, int]) -> Forecast:
+    return (await wait_shared(chunk, waiters))[index]
+
+
+def _start_forecast_chunks(
+    client: httpx.AsyncClient, missing: dict[str, tuple[float, float]], forecast_days: int, groups: tuple[str, ...]
+) -> dict[str, asyncio.Future]:
+    # Registers every key with the single-flight table so any other lookup of
+    # the same forecast joins the batched request.
+    pending: dict[str, asyncio.Future] = {}
+    missing_keys = list(missing)
+    chunk_size = max(1, settings.forecast_batch_size)
+    for offset in range(0, len(missing_keys), chunk_size):
+        chunk_keys = missing_keys[offset : offset + chunk_size]
+        chunk = asyncio.ensure_future(
+            _load_forecast_chunk(client, chunk_keys, [missing[key] for key in chunk_keys], forecast_days, groups)
+        )
+        chunk.add_done_callback(_consume_exception)
+        chunk_waiters: dict[asyncio.Future, int] = {}
+        for index, key in enumerate(chunk_keys):
+            pending[key] = _forecast_flights.start(
+                key, lambda chunk=chunk, index=index, waiters=chunk_waiters: _pick(chunk, index, waiters)
+            )
+    return pending
+
+
+async def _fetch_forecasts(
+    client: httpx.AsyncClient,
+    coordinates: list[tuple[float, float]],
+    groups: tuple[str, ...] = DETAIL_GROUPS["full"],
+    days: int | None = None,
+    record: bool = True,
+) -> list[Forecast | Exception]:
+    # Speculative prefetches pass record=False; the tool call that follows
+    # records the same request, and counting both would skew the warmer.
+    record_popularity = _popularity.record if record else lambda key, request: None
+    forecast_days = _fetch_days(groups, days or _max_forecast_days())
+    points = [_grid_point(latitude, longitude) for latitude, longitude in coordinates]
+    keys = [_forecast_key(latitude, longitude, forecast_days, groups) for latitude, longitude in points]
+
+    unique = dict(zip(keys, points))
+    results: dict[str, Forecast | Exception] = dict(_forecast_cache.get_many(list(unique)))
+    # A cached or in-flight forecast with more groups or days can be trimmed down.
+    variants = _superset_variants(groups, forecast_days)
+    supersets = {
+        key: {
+            _forecast_key(*point, variant_days, variant_groups): (point, variant_days, variant_groups)
+            for variant_groups, variant_days in variants
+        }
+        for key, point in unique.items()
+        if key not in results
+    }
+    cached_supersets = _forecast_cache.get_many([key for keys in supersets.values() for key in keys])
+    pending: dict[str, asyncio.Future] = {}
+    missing: dict[str, tuple[float, float]] = {}
+    for key, point in unique.items():
+        if key in results:
+            record_popularity(key, (point, forecast_days, groups))
             continue
-        except httpx.RequestError as e:
-            logger.error(f"Geocode request error for '{name}': {e}")
-            raise WeatherError("Unable to connect to geocoding service. Please check your internet connection.")
-        except Exception as e:
-            logger.error(f"Unexpected geocode error for '{name}': {e}", exc_info=True)
+        # Credit popularity to the entry that served the request so the warmer
+        # keeps that one fresh instead of fetching a narrower duplicate.
+        other = next((other for other in supersets[key] if other in cached_supersets), None)
+        if other is not None:
+            counters.inc("forecast_superset_hits")
+            record_popularity(other, supersets[key][other])
+            results[key] = cached_supersets[other]
             continue
+        other = next((other for other in [key, *supersets[key]] if other in _forecast_flights), None)
+        if other is not None:
+            record_popularity(other, supersets[key].get(other, (point, forecast_days, groups)))
+            pending[key] = _forecast_flights.join(other)
+        else:
+            record_popularity(key, (point, forecast_days, groups))
+            missing[key] = point
 
-    raise WeatherError(f"Could not find coordinates for '{location}'. Please check the spelling and try again.")
+    pending.update(_start_forecast_chunks(client, missing, forecast_days, groups))
 
+    loaded = await asyncio.gather(
+        *(_forecast_flights.wait(future) for future in pending.values()), return_exceptions=True
+    )
+    for key, result in zip(pending, loaded):
+        if isinstance(result, asyncio.CancelledError):
+            result = WeatherError("The weather request was cancelled. Please try again.")
+        if isinstance(result, Exception):
+            stale = _forecast_cache.get_stale(key)
+            if stale is not None:
+                logger.warning(f"Serving stale forecast for {key} after {type(result).__name__}")
+                counters.inc("forecast_stale_served")
+                result = stale
+        results[key] = result
+    return [results[key] for key in keys]
 
-async def _fetch_weather_with_client(
-    client: httpx.AsyncClient, location: str, units: str = "metric"
+
+def _build_weather(
+    place: dict,
+    forecast: Forecast,
+    units: str,
+    groups: tuple[str, ...] = DETAIL_GROUPS["full"],
+    days: int | None = None,
 ) -> dict:
-    place = await geocode_location(client, location)
+    days = days or _max_forecast_days()
+    return {
+        "location": {
+            "name": place.get("name"),
+            "country": place.get("country"),
+            "admin1": place.get("admin1"),
+            "latitude": place.get("latitude"),
+            "longitude": place.get("longitude"),
+            "timezone": forecast.extra.get("timezone"),
+        },
+        "current": convert_block(forecast.current, units) if "current" in groups else {},
+        "daily": convert_block(forecast.daily.decode(days), units) if "daily" in groups else {},
+        "hourly": convert_block(forecast.hourly.decode(days * 24), units) if "hourly" in groups else {},
+        "units": unit_labels(units),
+    }
+
 
+def _validate_place(place: dict, location: str) -> None:
     if "latitude" not in place or "longitude" not in place:
         raise WeatherError(f"Invalid location data for '{location}'.")
 
-    try:
-        params = {
-            "latitude": place["latitude"],
-            "longitude": place["longitude"],
-            "current": ",".join(
-                [
-                    "temperature_2m",
-                    "relative_humidity_2m",
-                    "apparent_temperature",
-                    "precipitation",
-                    "weather_code",
-                    "wind_speed_10m",
-                    "wind_direction_10m",
-                ]
-            ),
-            "hourly": ",".join(
-                [
-                    "temperature_2m",
-                    "precipitation_probability",
-                    "weather_code",
-                    "wind_speed_10m",
-                ]
-            ),
-            "daily": ",".join(
-                [
-                    "weather_code",
-                    "temperature_2m_max",
-                    "temperature_2m_min",
-                    "precipitation_sum",
-                    "wind_speed_10m_max",
-                    "sunrise",
-                    "sunset",
-                ]
-            ),
-            "forecast_days": settings.forecast_days or DEFAULT_FORECAST_DAYS,
-            "timezone": "auto",
-            **units_params(units),
-        }
-        response = await client.get(
-            FORECAST_API_URL, params=params, timeout=settings.http_timeout_seconds
-        )
-        response.raise_for_status()
-        data = response.json()
 
-        if not isinstance(data, dict):
-            raise WeatherError("Invalid response format from weather service.")
+async def _fetch_weather_with_client(
+    client: httpx.AsyncClient,
+    location: str,
+    units: str = "metric",
+    detail: str | None = None,
+    days: int | None = None,
+) -> dict:
+    groups, days = resolve_projection(detail, days)
+    place = await geocode_location(client, location)
+    _validate_place(place, location)
 
-        if "error" in data:
-            error_msg = data.get("reason", "Unknown error from weather service.")
-            raise WeatherError(f"Weather service error: {error_msg}")
+    [forecast] = await _fetch_forecasts(client, [(place["latitude"], place["longitude"])], groups, days)
+    if isinstance(forecast, Exception):
+        raise _forecast_error(forecast, location)
+    return _build_weather(place, forecast, units, groups, days)
 
-        return {
-            "location": {
-                "name": place.get("name"),
-                "country": place.get("country"),
-                "admin1": place.get("admin1"),
-                "latitude": place.get("latitude"),
-                "longitude": place.get("longitude"),
-                "timezone": data.get("timezone"),
-            },
-            "current": data.get("current", {}),
-            "daily": data.get("daily", {}),
-            "hourly": data.get("hourly", {}),
-            "units": {
-                "temperature": data.get("current_units", {}).get("temperature_2m", "°C"),
-                "wind_speed": data.get("current_units", {}).get("wind_speed_10m", "km/h"),
-                "precipitation": data.get("current_units", {}).get("precipitation", "mm"),
-            },
-        }
-    except httpx.TimeoutException:
-        logger.error(f"Weather fetch timeout for '{location}'")
-        raise WeatherError("Request timeout. The weather service is taking too long to respond.")
-    except httpx.HTTPStatusError as e:
-        logger.error(f"Weather HTTP error for '{location}': {e.response.status_code}")
-        if e.response.status_code >= 500:
-            raise WeatherError("Weather service is temporarily unavailable. Please try again later.")
-        raise WeatherError(f"Failed to fetch weather data. Status: {e.response.status_code}")
-    except httpx.RequestError as e:
-        logger.error(f"Weather request error for '{location}': {e}")
-        raise WeatherError("Unable to connect to weather service. Please check your internet connection.")
-    except WeatherError:
-        raise
-    except Exception as e:
-        logger.error(f"Unexpected weather fetch error for '{location}': {e}", exc_info=True)
-        raise WeatherError("An unexpected error occurred while fetching weather data.")
+
+async def fetch_weather(
+    location: str, units: str = "metric", detail: str | None = None, days: int | None = None
+) -> dict:
+    return await _fetch_weather_with_client(get_http_client(), location, units, detail, days)
 
 
-async def fetch_weather(location: str, units: str = "metric") -> dict:
-    async with create_http_client() as client:
-        return await _fetch_weather_with_client(client, location, units)
+async def _prefetch_forecasts(
+    client: httpx.AsyncClient, locations: list[str], detail: str | None, days: int | None, forecasts: bool
+) -> None:
+    groups, days = resolve_projection(detail, days)
+    places = await asyncio.gather(
+        *(geocode_location(client, location) for location in locations), return_exceptions=True
+    )
+    points = [
+        (place["latitude"], place["longitude"])
+        for place in places
+        if isinstance(place, dict) and "latitude" in place and "longitude" in place
+    ]
+    if forecasts and points:
+        # Same batched, single-flight path as real lookups, so the tool call
+        # joins these requests instead of repeating them.
+        await _fetch_forecasts(client, points, groups, days, record=False)
+
+
+def prefetch_weather(
+    locations: list[str], detail: str | None = None, days: int | None = None, forecasts: bool = True
+) -> asyncio.Task:
+    task = asyncio.ensure_future(_prefetch_forecasts(get_http_client(), locations, detail, days, forecasts))
+    task.add_done_callback(_log_prefetch_result)
+    return task
+
+
+def _log_prefetch_result(task: asyncio.Task) -> None:
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.info(f"Speculative weather prefetch failed: {exc}")
+
+
+def _location_error(location: str, exc: Exception) -> dict:
+    if not isinstance(exc, WeatherError):
+        logger.error(f"Error fetching weather for '{location}': {exc}")
+        exc = WeatherError(f"Failed to fetch weather for '{location}'.")
+    return {"error": True, "location": location, "message": str(exc)}
+
+
+async def _fetch_weather_chunk(
+    client: httpx.AsyncClient,
+    chunk: list[tuple[int, str]],
+    units: str,
+    groups: tuple[str, ...],
+    days: int,
+) -> list[tuple[int, dict]]:
+    places = await asyncio.gather(
+        *(geocode_location(client, location) for _, location in chunk), return_exceptions=True
+    )
+    results: list[tuple[int, dict]] = []
+    found: list[tuple[int, str, dict]] = []
+    for (index, location), place in zip(chunk, places):
+        if not isinstance(place, Exception) and ("latitude" not in place or "longitude" not in place):
+            place = WeatherError(f"Invalid location data for '{location}'.")
+        if isinstance(place, Exception):
+            results.append((index, _location_error(location, place)))
+        else:
+            found.append((index, location, place))
+    if found:
+        forecasts = await _fetch_forecasts(
+            client, [(place["latitude"], place["longitude"]) for _, _, place in found], groups, days
+        )
+        for (index, location, place), forecast in zip(found, forecasts):
+            if isinstance(forecast, Exception):
+                results.append((index, _location_error(location, _forecast_error(forecast, location))))
+            else:
+                results.append((index, _build_weather(place, forecast, units, groups, days)))
+    return results
 
 
-async def fetch_weather_batch(locations: list[str], units: str = "metric") -> list[dict]:
+async def stream_weather_batch(
+    locations: list[str], units: str = "metric", detail: str | None = None, days: int | None = None
+) -> AsyncGenerator[tuple[int, dict], None]:
+    # Yields (index, result) as each chunk completes; a location that fails
+    # yields an error dict instead of ending the batch.
     if not locations:
         raise WeatherError("No locations provided.")
-    if len(locations) > settings.max_locations_per_request:
+    if len(locations) > settings.max_streamed_locations_per_request:
         raise WeatherError(
-            f"Too many locations. Maximum {settings.max_locations_per_request} locations allowed per request."
+            f"Too many locations. Maximum {settings.max_streamed_locations_per_request} locations allowed per request."
         )
 
-    async with create_http_client() as client:
-        tasks = [_fetch_weather_with_client(client, location, units) for location in locations]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        processed = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                logger.error(f"Error fetching weather for '{locations[i]}': {result}")
-                if isinstance(result, WeatherError):
-                    raise result
-                raise WeatherError(f"Failed to fetch weather for '{locations[i]}': {str(result)}")
-            processed.append(result)
-        return processed
-
-    
\ No newline at end of file
+    groups, days = resolve_projection(detail, days)
+    client = get_http_client()
+    if isinstance(_geocode_cache, TieredCache):
+        # One batched read pulls shared-cache hits into this worker's memory
+        # before the per-location lookups run; the in-memory cache has nothing
+        # to pull and would only count every lookup twice.
+        _geocode_cache.get_many(list(dict.fromkeys(normalize_location(location) for location in locations)))
+    # A batch that fits one forecast request is fetched as one chunk. Larger
+    # batches need several requests anyway, so they go in small chunks that
+    # keep results flowing; the semaphore bounds chunks in flight.
+    if len(locations) <= settings.forecast_batch_size:
+        chunk_size = len(locations)
+    else:
+        chunk_size = max(1, min(settings.weather_stream_chunk_size, settings.forecast_batch_size))
+    indexed = list(enumerate(locations))
+    limit = asyncio.Semaphore(max(1, settings.weather_stream_concurrency))
+
+    async def run_chunk(chunk: list[tuple[int, str]]) -> list[tuple[int, dict]]:
+        async with limit:
+            return await _fetch_weather_chunk(client, chunk, units, groups, days)
+
+    tasks = [
+        asyncio.ensure_future(run_chunk(indexed[offset : offset + chunk_size]))
+        for offset in range(0, len(indexed), chunk_size)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for item in await next_done:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _popular_forecasts() -> list[tuple[str, tuple[tuple[float, float], int, tuple[str, ...]]]]:
+    return [
+        (key, request)
+        for key, request in _popularity.top(settings.forecast_warmer_top_n)
+        if request[1] <= _max_forecast_days()
+    ]
+
+
+def extend_popular_forecasts(grace: float) -> set[str]:
+    # Keeps popular entries servable across an update boundary until the warmer
+    # has fetched the new data, instead of letting user requests miss.
+    extended = set()
+    for key, _ in _popular_forecasts():
+        remaining = _forecast_cache.remaining_ttl(key)
+        value = _forecast_cache.get_stale(key)
+        if remaining is None or remaining <= 0 or value is None:
+            continue
+        _forecast_cache.set(key, value, ttl=remaining + grace)
+        extended.add(key)
+    return extended
+
+
+async def refresh_popular_forecasts(
+    expiring_within: float, requests_per_second: float, keys: set[str] | None = None
+) -> int:
+    # ``keys`` are refreshed regardless of their TTL; extended entries look
+    # fresh but still hold the previous update's data.
+    keys = keys or set()
+    # Multi-coordinate requests share their parameters, so batch by projection.
+    due: dict[tuple[int, tuple[str, ...]], list[tuple[str, tuple[float, float]]]] = {}
+    for key, (point, forecast_days, groups) in _popular_forecasts():
+        if key in _forecast_flights:
+            continue
+        if key in keys or (_forecast_cache.remaining_ttl(key) or 0) <= expiring_within:
+            due.setdefault((forecast_days, groups), []).append((key, point))
+    chunks = [
+        (forecast_days, groups, entries[offset : offset + max(1, settings.forecast_batch_size)])
+        for (forecast_days, groups), entries in due.items()
+        for offset in range(0, len(entries), max(1, settings.forecast_batch_size))
+    ]
+    client = get_http_client()
+    interval = 1 / requests_per_second if requests_per_second > 0 else 0.0
+    refreshed = 0
+    for position, (forecast_days, groups, chunk) in enumerate(chunks):
+        if position and interval:
+            await asyncio.sleep(interval)
+        # Keys a user request started meanwhile are already being fetched.
+        missing = {key: point for key, point in chunk if key not in _forecast_flights}
+        if not missing:
+            continue
+        pending = _start_forecast_chunks(client, missing, forecast_days, groups)
+        try:
+            await asyncio.gather(*(_forecast_flights.wait(future) for future in pending.values()))
+        except Exception as exc:
+            logger.warning(f"Forecast warmer stopped after {refreshed} refreshes: {type(exc).__name__}")
+            counters.inc("forecast_warmer_errors")
+            break
+        refreshed += len(missing)
+    counters.inc("forecast_warmer_refreshed", refreshed)
+    return refreshed
+
+
+def upstream_health() -> dict:
+    return {
+        "geocode": _geocode_upstream.stats(),
+        "forecast": _forecast_upstream.stats(),
+    }
+
+
+def weather_cache_stats() -> dict:
+    return {
+        "geocode": {**_geocode_cache.stats(), **_geocode_flights.stats()},
+        "geocode_negative": _geocode_misses.stats(),
+        "forecast": {**_forecast_cache.stats(), **_forecast_flights.stats()},
+        "gazetteer": {"places": len(_gazetteer) if _gazetteer is not None else 0},
+        "popularity": _popularity.stats(),
+    }
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import math
+import time
+from array import array
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any
+
+INT_MISSING = -(2**31)
+TIME_FORMATS = {16: "%Y-%m-%dT%H:%M", 10: "%Y-%m-%d"}
+
+
+def _parse_time(value: Any) -> tuple[int, str] | None:
+    if not isinstance(value, str):
+        return None
+    fmt = TIME_FORMATS.get(len(value))
+    if fmt is None:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    # Open-Meteo returns naive local times; UTC here is only an encoding.
+    return int(parsed.replace(tzinfo=timezone.utc).timestamp()), fmt
+
+
+def _format_time(seconds: int, fmt: str) -> str:
+    return time.strftime(fmt, time.gmtime(seconds))
+
+
+@lru_cache(maxsize=1024)
+def _time_range(start: int, step: int, count: int, fmt: str) -> tuple[str, ...]:
+    # Forecasts fetched in the same update window share their time axes.
+    return tuple(_format_time(start + index * step, fmt) for index in range(count))
+
+
+class TimeAxis:
+    __slots__ = ("start", "step", "count", "fmt")
+
+    def __init__(self, start: int, step: int, count: int, fmt: str) -> None:
+        self.start = start
+        self.step = step
+        self.count = count
+        self.fmt = fmt
+
+    @classmethod
+    def encode(cls, values: list) -> TimeAxis | None:
+        if not values:
+            return None
+        first = _parse_time(values[0])
+        second = _parse_time(values[1]) if len(values) > 1 else first
+        if first is None or second is None or first[1] != second[1]:
+            return None
+        axis = cls(first[0], second[0] - first[0], len(values), first[1])
+        # Only keep the compact form when it reproduces every input timestamp,
+        # which also rejects irregular spacing such as DST gaps.
+        if _time_range(axis.start, axis.step, axis.count, axis.fmt) != tuple(values):
+            return None
+        return axis
+
+    def decode(self, limit: int | None = None) -> list[str]:
+        count = self.count if limit is None else min(limit, self.count)
+        return list(_time_range(self.start, self.step, count, self.fmt))
+
+
+class Column:
+    __slots__ = ("kind", "values", "fmt")
+
+    def __init__(self, kind: str, values: Any, fmt: str | None = None) -> None:
+        self.kind = kind
+        self.values = values
+        self.fmt = fmt
+
+    @classmethod
+    def encode(cls, values: list) -> Column:
+        types = set(map(type, values))
+        types.discard(type(None))
+        if types == {int}:
+            present = [value for value in values if value is not None]
+            if INT_MISSING < min(present) and max(present) < 2**31:
+                return cls("int", array("i", [INT_MISSING if value is None else value for value in values]))
+        if types and types <= {int, float}:
+            return cls("float", array("d", [math.nan if value is None else value for value in values]))
+        if types == {str} and None not in values:
+            parsed = [_parse_time(value) for value in values]
+            if all(item is not None for item in parsed) and len({fmt for _, fmt in parsed}) == 1:
+                column = cls("time", array("q", [second for second, _ in parsed]), parsed[0][1])
+                if column.decode() == list(values):
+                    return column
+        return cls("raw", tuple(values))
+
+    def decode(self, limit: int | None = None) -> list:
+        values = self.values if limit is None else self.values[:limit]
+        if self.kind == "int":
+            return [None if value == INT_MISSING else value for value in values]
+        if self.kind == "float":
+            return [None if math.isnan(value) else value for value in values]
+        if self.kind == "time":
+            return [_format_time(value, self.fmt) for value in values]
+        return list(values)
+
+    def nbytes(self) -> int:
+        if isinstance(self.values, array):
+            return self.values.itemsize * len(self.values)
+        return sum(len(str(value)) for value in self.values)
+
+
+class SeriesBlock:
+    __slots__ = ("time", "columns", "scalars")
+
+    def __init__(self, time: TimeAxis | Column | None, columns: dict[str, Column], scalars: dict) -> None:
+        self.time = time
+        self.columns = columns
+        self.scalars = scalars
+
+    @classmethod
+    def encode(cls, block: dict) -> SeriesBlock:
+        times = block.get("time")
+        time_axis = None
+        if isinstance(times, list):
+            time_axis = TimeAxis.encode(times) or Column.encode(times)
+        columns = {}
+        scalars = {}
+        for field, value in block.items():
+            if field == "time" and time_axis is not None:
+                continue
+            if isinstance(value, list):
+                columns[field] = Column.encode(value)
+            else:
+                scalars[field] = value
+        return cls(time_axis, columns, scalars)
+
+    def decode(self, limit: int | None = None) -> dict:
+        decoded = dict(self.scalars)
+        if self.time is not None:
+            decoded["time"] = self.time.decode(limit)
+        for field, column in self.columns.items():
+            decoded[field] = column.decode(limit)
+        return decoded
+
+    def nbytes(self) -> int:
+        return sum(column.nbytes() for column in self.columns.values())
+
+
+class Forecast:
+    """Cached Open-Meteo forecast with hourly/daily series held as typed arrays."""
+
+    __slots__ = ("current", "hourly", "daily", "extra")
+
+    def __init__(self, current: dict, hourly: SeriesBlock, daily: SeriesBlock, extra: dict) -> None:
+        self.current = current
+        self.hourly = hourly
+        self.daily = daily
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Forecast:
+        extra = {key: value for key, value in data.items() if key not in ("current", "hourly", "daily")}
+        return cls(
+            data.get("current") or {},
+            SeriesBlock.encode(data.get("hourly") or {}),
+            SeriesBlock.encode(data.get("daily") or {}),
+            extra,
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            **self.extra,
+            "current": self.current,
+            "hourly": self.hourly.decode(),
+            "daily": self.daily.decode(),
+        }
+
+    def nbytes(self) -> int:
+        return self.hourly.nbytes() + self.daily.nbytes()
@@ -0,0 +1,252 @@
+"""Compact, memory-mapped city gazetteer built from GeoNames dumps.
+
+Build a file with::
+
+    python -m app.utils.gazetteer cities15000.txt gazetteer.bin \
+        --countries countryInfo.txt --admin1 admin1CodesASCII.txt
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import mmap
+import re
+import struct
+import sys
+import unicodedata
+from pathlib import Path
+
+MAGIC = b"LGZ1"
+HEADER = struct.Struct("<4sIIIII")
+# latitude, longitude, population, name, admin1, country (offset/length into the
+# string pool), country code, admin1 code
+RECORD = struct.Struct("<ffIIHIHIH2s8s")
+# key offset, key length, record number; sorted by key then population
+INDEX_ENTRY = struct.Struct("<IHI")
+PREFIX_SCAN_LIMIT = 200
+
+
+def normalize_name(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return re.sub(r"\s+", " ", stripped.strip().lower())
+
+
+class Gazetteer:
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, _, self.record_count, self.index_count, self._records_at, self._index_at = HEADER.unpack_from(
+            self._map, 0
+        )
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{self.path} is not a gazetteer file")
+        self._strings_at = self._index_at + self.index_count * INDEX_ENTRY.size
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __len__(self) -> int:
+        return self.record_count
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings_at + offset
+        return self._map[start:start + length].decode("utf-8")
+
+    def _entry(self, position: int) -> tuple[bytes, int]:
+        key_offset, key_length, record = INDEX_ENTRY.unpack_from(
+            self._map, self._index_at + position * INDEX_ENTRY.size
+        )
+        start = self._strings_at + key_offset
+        return self._map[start:start + key_length], record
+
+    def _lower_bound(self, key: bytes) -> int:
+        low, high = 0, self.index_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _record(self, number: int) -> dict:
+        (
+            latitude,
+            longitude,
+            population,
+            name_offset,
+            name_length,
+            admin1_offset,
+            admin1_length,
+            country_offset,
+            country_length,
+            country_code,
+            admin1_code,
+        ) = RECORD.unpack_from(self._map, self._records_at + number * RECORD.size)
+        return {
+            "name": self._string(name_offset, name_length),
+            "latitude": round(latitude, 5),
+            "longitude": round(longitude, 5),
+            "country": self._string(country_offset, country_length),
+            "country_code": country_code.decode("ascii"),
+            "admin1": self._string(admin1_offset, admin1_length) or None,
+            "admin1_code": admin1_code.rstrip(b"\0").decode("ascii"),
+            "population": population,
+        }
+
+    def _matches(self, key: str, prefix: bool) -> list[int]:
+        encoded = key.encode("utf-8")
+        position = self._lower_bound(encoded)
+        records: list[int] = []
+        while position < self.index_count and len(records) < PREFIX_SCAN_LIMIT:
+            entry_key, record = self._entry(position)
+            if entry_key != encoded and not (prefix and entry_key.startswith(encoded)):
+                break
+            if record not in records:
+                records.append(record)
+            position += 1
+        return records
+
+    def lookup(self, location: str, prefix: bool = False) -> dict | None:
+        # Prefix matches ("Avon" -> "Avondale") are guesses, so callers only
+        # ask for them when nothing better is available.
+        name, _, qualifier = location.partition(",")
+        key = normalize_name(name)
+        if not key or (prefix and len(key) < 4):
+            return None
+        qualifier = normalize_name(qualifier)
+        candidates = [self._record(number) for number in self._matches(key, prefix)]
+        if qualifier:
+            candidates = [place for place in candidates if _qualifies(place, qualifier)]
+        if not candidates:
+            return None
+        # Exact matches are already ordered by population; prefix scans mix
+        # names, so re-rank them.
+        return max(candidates, key=lambda place: place["population"]) if prefix else candidates[0]
+
+
+def _qualifies(place: dict, qualifier: str) -> bool:
+    return qualifier in {
+        place["country_code"].lower(),
+        normalize_name(place["country"]),
+        normalize_name(place["admin1"] or ""),
+        place["admin1_code"].lower(),
+    }
+
+
+def _read_countries(path: str | None) -> dict[str, str]:
+    if not path:
+        return {}
+    countries = {}
+    with open(path, encoding="utf-8") as handle:
+        for row in csv.reader(handle, delimiter="\t"):
+            if row and not row[0].startswith("#") and len(row) > 4:
+                countries[row[0]] = row[4]
+    return countries
+
+
+def _read_admin1(path: str | None) -> dict[str, str]:
+    if not path:
+        return {}
+    names = {}
+    with open(path, encoding="utf-8") as handle:
+        for row in csv.reader(handle, delimiter="\t"):
+            if len(row) > 1:
+                names[row[0]] = row[1]
+    return names
+
+
+def build_gazetteer(
+    cities_path: str,
+    output_path: str,
+    countries_path: str | None = None,
+    admin1_path: str | None = None,
+    min_population: int = 0,
+    alternate_names: bool = False,
+) -> int:
+    countries = _read_countries(countries_path)
+    admin1_names = _read_admin1(admin1_path)
+    pool = bytearray()
+    pool_offsets: dict[str, tuple[int, int]] = {}
+
+    def intern(text: str) -> tuple[int, int]:
+        if text not in pool_offsets:
+            encoded = text.encode("utf-8")[:65535]
+            pool_offsets[text] = (len(pool), len(encoded))
+            pool.extend(encoded)
+        return pool_offsets[text]
+
+    records = bytearray()
+    keys: list[tuple[str, int, int]] = []
+    count = 0
+    csv.field_size_limit(sys.maxsize)
+    with open(cities_path, encoding="utf-8") as handle:
+        for row in csv.reader(handle, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if len(row) < 15:
+                continue
+            population = int(row[14] or 0)
+            if population < min_population:
+                continue
+            country_code, admin1_code = row[8], row[10]
+            name_offset, name_length = intern(row[1])
+            admin1_offset, admin1_length = intern(admin1_names.get(f"{country_code}.{admin1_code}", ""))
+            country_offset, country_length = intern(countries.get(country_code, country_code))
+            records += RECORD.pack(
+                float(row[4]),
+                float(row[5]),
+                population,
+                name_offset,
+                name_length,
+                admin1_offset,
+                admin1_length,
+                country_offset,
+                country_length,
+                country_code.encode("ascii")[:2],
+                admin1_code.encode("ascii")[:8],
+            )
+            names = {row[1], row[2]}
+            if alternate_names:
+                names.update(name for name in row[3].split(",") if name)
+            for name in names:
+                key = normalize_name(name)
+                if key:
+                    keys.append((key, -population, count))
+            count += 1
+
+    keys.sort(key=lambda item: (item[0].encode("utf-8"), item[1]))
+    index = bytearray()
+    for key, _, record in keys:
+        key_offset, key_length = intern(key)
+        index += INDEX_ENTRY.pack(key_offset, key_length, record)
+
+    records_at = HEADER.size
+    index_at = records_at + len(records)
+    with open(output_path, "wb") as handle:
+        handle.write(HEADER.pack(MAGIC, 1, count, len(keys), records_at, index_at))
+        handle.write(records)
+        handle.write(index)
+        handle.write(pool)
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build a gazetteer file from a GeoNames cities dump.")
+    parser.add_argument("cities", help="GeoNames cities TSV, e.g. cities15000.txt")
+    parser.add_argument("output")
+    parser.add_argument("--countries", help="GeoNames countryInfo.txt for country names")
+    parser.add_argument("--admin1", help="GeoNames admin1CodesASCII.txt for region names")
+    parser.add_argument("--min-population", type=int, default=0)
+    parser.add_argument("--alternate-names", action="store_true", help="Index alternate names as well")
+    args = parser.parse_args()
+    count = build_gazetteer(
+        args.cities, args.output, args.countries, args.admin1, args.min_population, args.alternate_names
+    )
+    print(f"Wrote {count} places to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
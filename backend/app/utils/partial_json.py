@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import json
+
+
+def _string_end(text: str, start: int) -> int:
+    index = start + 1
+    while index < len(text):
+        char = text[index]
+        if char == "\\":
+            index += 2
+            continue
+        if char == '"':
+            return index
+        index += 1
+    return -1
+
+
+def complete_string_values(text: str, key: str, list_key: str | None = None) -> list[str]:
+    values: list[str] = []
+    # Each frame is [kind, current_key, expecting_key]; only finished strings are reported.
+    stack: list[list] = []
+    index = 0
+    while index < len(text):
+        char = text[index]
+        frame = stack[-1] if stack else None
+        if char in "{[":
+            parent_key = frame[1] if frame and frame[0] == "object" and not frame[2] else None
+            stack.append(["object", None, True] if char == "{" else ["array", parent_key, False])
+        elif char in "}]":
+            if stack:
+                stack.pop()
+        elif char == ":" and frame and frame[0] == "object":
+            frame[2] = False
+        elif char == "," and frame and frame[0] == "object":
+            frame[1], frame[2] = None, True
+        elif char == '"':
+            end = _string_end(text, index)
+            if end == -1:
+                break
+            try:
+                value = json.loads(text[index : end + 1])
+            except ValueError:
+                value = None
+            if frame and frame[0] == "object" and frame[2]:
+                frame[1] = value
+            elif isinstance(value, str):
+                if len(stack) == 1 and frame[0] == "object" and frame[1] == key:
+                    values.append(value)
+                elif list_key and len(stack) == 2 and frame[0] == "array" and frame[1] == list_key:
+                    values.append(value)
+            index = end
+        index += 1
+    return values
+
+
+class PartialArguments:
+    def __init__(self, key: str, list_key: str | None = None) -> None:
+        self.key = key
+        self.list_key = list_key
+        self.text = ""
+        self._emitted = 0
+
+    def feed(self, fragment: str) -> list[str]:
+        self.text += fragment
+        values = complete_string_values(self.text, self.key, self.list_key)
+        fresh = values[self._emitted :]
+        self._emitted = len(values)
+        return fresh
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import math
+import time
+from collections.abc import Hashable
+from typing import Any
+
+
+class DecayedTopN:
+    """Bounded exponentially decayed counter for tracking the hottest keys."""
+
+    def __init__(self, capacity: int, half_life: float) -> None:
+        self.capacity = capacity
+        self.half_life = half_life
+        self._epoch = time.monotonic()
+        self._scores: dict[Hashable, float] = {}
+        self._values: dict[Hashable, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def _weight(self) -> float:
+        # Scores are stored relative to a fixed epoch, so decaying every entry
+        # is implicit: newer hits simply carry more weight.
+        return math.pow(2.0, (time.monotonic() - self._epoch) / self.half_life)
+
+    def record(self, key: Hashable, value: Any = None) -> None:
+        if self.capacity <= 0:
+            return
+        weight = self._weight()
+        if weight > 1e12:
+            self._rebase(weight)
+            weight = 1.0
+        if key not in self._scores and len(self._scores) >= self.capacity:
+            coldest = min(self._scores, key=self._scores.__getitem__)
+            del self._scores[coldest]
+            self._values.pop(coldest, None)
+        self._scores[key] = self._scores.get(key, 0.0) + weight
+        self._values[key] = value
+
+    def _rebase(self, weight: float) -> None:
+        self._epoch = time.monotonic()
+        self._scores = {key: score / weight for key, score in self._scores.items()}
+
+    def score(self, key: Hashable) -> float:
+        return self._scores.get(key, 0.0) / self._weight()
+
+    def top(self, count: int) -> list[tuple[Hashable, Any]]:
+        ranked = sorted(self._scores, key=self._scores.__getitem__, reverse=True)[:count]
+        return [(key, self._values.get(key)) for key in ranked]
+
+    def stats(self) -> dict:
+        return {"tracked": len(self._scores), "capacity": self.capacity}
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from collections.abc import Callable, Hashable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from app.utils.cache import TTLCache
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# (to JSON-compatible value, from JSON-compatible value) for objects stored in the shared file
+Codec = tuple[Callable[[Any], Any], Callable[[Any], Any]]
+
+PURGE_EVERY_WRITES = 256
+COMPRESS_MIN_BYTES = 512
+
+
+def _encode(value: Any) -> bytes:
+    raw = orjson.dumps(value) if orjson is not None else json.dumps(value, separators=(",", ":")).encode()
+    if len(raw) < COMPRESS_MIN_BYTES:
+        return b"j" + raw
+    return b"z" + zlib.compress(raw, 1)
+
+
+def _decode(blob: bytes) -> Any:
+    raw = zlib.decompress(blob[1:]) if blob[:1] == b"z" else blob[1:]
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+class SqliteCache:
+    """TTL cache stored in a SQLite file so every worker on a host shares it.
+
+    Reads stay synchronous: they are single indexed lookups on a WAL-mode
+    database that writers don't block, and they never wait for a lock (a busy
+    database counts as a miss), so a thread hop would cost more than the query
+    and would make every cache lookup on the request path async. Writes go to
+    one background thread, since other workers can hold the write lock.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str,
+        maxsize: int,
+        ttl: float,
+        stale_ttl: float = 0.0,
+        codec: Codec | None = None,
+    ) -> None:
+        self.path = path
+        self.codec = codec
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._write_connection = sqlite3.connect(
+            path, timeout=1.0, check_same_thread=False, isolation_level=None
+        )
+        self._write_connection.execute("PRAGMA journal_mode=WAL")
+        self._write_connection.execute("PRAGMA synchronous=NORMAL")
+        self._write_connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, expires_at REAL NOT NULL, value BLOB NOT NULL, "
+            "PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+        )
+        self._write_connection.execute(
+            "CREATE INDEX IF NOT EXISTS cache_entries_expiry ON cache_entries (namespace, expires_at)"
+        )
+        self._connection = sqlite3.connect(path, timeout=0.0, check_same_thread=False, isolation_level=None)
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"cache-{namespace}")
+
+    def _query(self, sql: str, parameters: tuple = ()) -> list[tuple]:
+        try:
+            with self._lock:
+                return self._connection.execute(sql, parameters).fetchall()
+        except sqlite3.Error as exc:
+            self.errors += 1
+            logger.warning(f"Shared cache '{self.namespace}' read failed: {exc}")
+            return []
+
+    def _execute(self, sql: str, parameters: tuple = ()) -> None:
+        # Only called on the writer thread.
+        try:
+            self._write_connection.execute(sql, parameters)
+        except sqlite3.Error as exc:
+            self.errors += 1
+            logger.warning(f"Shared cache '{self.namespace}' write failed: {exc}")
+
+    def _submit(self, work: Callable, *args: Any) -> None:
+        try:
+            self._writer.submit(work, *args)
+        except RuntimeError:
+            # The executor is shut down during interpreter exit.
+            pass
+
+    def flush(self) -> None:
+        self._writer.submit(lambda: None).result()
+
+    def _dump(self, value: Any) -> bytes:
+        return _encode(self.codec[0](value) if self.codec else value)
+
+    def _load(self, blob: bytes) -> Any:
+        value = _decode(blob)
+        return self.codec[1](value) if self.codec else value
+
+    def _row(self, key: Hashable) -> tuple[float, bytes] | None:
+        rows = self._query(
+            "SELECT expires_at, value FROM cache_entries WHERE namespace = ? AND key = ?",
+            (self.namespace, str(key)),
+        )
+        return rows[0] if rows else None
+
+    def __len__(self) -> int:
+        rows = self._query("SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.namespace,))
+        return rows[0][0] if rows else 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        row = self._row(key)
+        return row is not None and row[0] > time.time()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self.get_entries([key]).get(key)
+        return default if entry is None else entry[0]
+
+    def get_many(self, keys: list[Hashable]) -> dict[Hashable, Any]:
+        return {key: value for key, (value, _) in self.get_entries(keys).items()}
+
+    def get_entries(self, keys: list[Hashable]) -> dict[Hashable, tuple[Any, float]]:
+        # Fresh entries as (value, expires_at on the wall clock).
+        if not keys:
+            return {}
+        by_name = {str(key): key for key in keys}
+        placeholders = ",".join("?" for _ in by_name)
+        rows = self._query(
+            "SELECT key, expires_at, value FROM cache_entries "
+            f"WHERE namespace = ? AND expires_at > ? AND key IN ({placeholders})",
+            (self.namespace, time.time(), *by_name),
+        )
+        found = {by_name[name]: (self._load(blob), expires_at) for name, expires_at, blob in rows}
+        self.hits += len(found)
+        self.misses += len(by_name) - len(found)
+        return found
+
+    def get_stale(self, key: Hashable, default: Any = None) -> Any:
+        row = self._row(key)
+        if row is None or row[0] + self.stale_ttl <= time.time():
+            return default
+        return self._load(row[1])
+
+    def remaining_ttl(self, key: Hashable) -> float | None:
+        row = self._row(key)
+        return None if row is None else row[0] - time.time()
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self._submit(self._write_entry, str(key), value, expires_at)
+
+    def _write_entry(self, key: str, value: Any, expires_at: float) -> None:
+        self._execute(
+            "INSERT OR REPLACE INTO cache_entries (namespace, key, expires_at, value) VALUES (?, ?, ?, ?)",
+            (self.namespace, key, expires_at, self._dump(value)),
+        )
+        self._writes += 1
+        if self._writes % PURGE_EVERY_WRITES == 0:
+            self._purge()
+
+    def purge(self) -> None:
+        self._submit(self._purge)
+
+    def _purge(self) -> None:
+        self._execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?",
+            (self.namespace, time.time() - self.stale_ttl),
+        )
+        self._execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+            "SELECT key FROM cache_entries WHERE namespace = ? ORDER BY expires_at "
+            "LIMIT max(0, (SELECT COUNT(*) FROM cache_entries WHERE namespace = ?) - ?))",
+            (self.namespace, self.namespace, self.namespace, self.maxsize),
+        )
+
+    def delete(self, key: Hashable) -> None:
+        self._submit(
+            self._execute, "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, str(key))
+        )
+
+    def clear(self) -> None:
+        self._submit(self._execute, "DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+
+class TieredCache:
+    """A per-process TTLCache in front of a shared cache."""
+
+    def __init__(self, local: TTLCache, shared: SqliteCache) -> None:
+        self.local = local
+        self.shared = shared
+
+    def __len__(self) -> int:
+        return len(self.local)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.local or key in self.shared
+
+    def _promote(self, key: Hashable, value: Any, expires_at: float) -> None:
+        remaining = expires_at - time.time()
+        if remaining > 0:
+            self.local.set(key, value, ttl=remaining)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        entry = self.shared.get_entries([key]).get(key)
+        if entry is None:
+            return default
+        self._promote(key, *entry)
+        return entry[0]
+
+    def get_many(self, keys: list[Hashable]) -> dict[Hashable, Any]:
+        found = self.local.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        for key, (value, expires_at) in self.shared.get_entries(missing).items():
+            self._promote(key, value, expires_at)
+            found[key] = value
+        return found
+
+    def get_stale(self, key: Hashable, default: Any = None) -> Any:
+        value = self.local.get_stale(key)
+        if value is None:
+            value = self.shared.get_stale(key)
+        return default if value is None else value
+
+    def remaining_ttl(self, key: Hashable) -> float | None:
+        remaining = self.local.remaining_ttl(key)
+        return remaining if remaining is not None else self.shared.remaining_ttl(key)
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        self.local.set(key, value, ttl=ttl)
+        self.shared.set(key, value, ttl=ttl)
+
+    def delete(self, key: Hashable) -> None:
+        self.local.delete(key)
+        self.shared.delete(key)
+
+    def clear(self) -> None:
+        self.local.clear()
+        self.shared.clear()
+
+    def stats(self) -> dict:
+        return {**self.local.stats(), "shared": self.shared.stats()}
+
+
+def create_cache(
+    namespace: str,
+    maxsize: int,
+    ttl: float,
+    stale_ttl: float = 0.0,
+    backend: str = "memory",
+    path: str | None = None,
+    codec: Codec | None = None,
+) -> TTLCache | TieredCache:
+    local = TTLCache(maxsize=maxsize, ttl=ttl, stale_ttl=stale_ttl)
+    if backend != "sqlite" or not path:
+        return local
+    try:
+        shared = SqliteCache(path, namespace, maxsize, ttl, stale_ttl, codec)
+    except sqlite3.Error as exc:
+        logger.error(f"Could not open shared cache at {path}; using memory only: {exc}")
+        return local
+    return TieredCache(local, shared)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+
+async def wait_shared(future: asyncio.Future, waiters: dict[asyncio.Future, int]) -> Any:
+    # Waiters are reference counted so that the shared work is only cancelled
+    # once every caller awaiting it has been cancelled.
+    waiters[future] = waiters.get(future, 0) + 1
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        if waiters.get(future) == 1 and not future.done():
+            future.cancel()
+        raise
+    finally:
+        remaining = waiters.get(future, 1) - 1
+        if remaining:
+            waiters[future] = remaining
+        else:
+            waiters.pop(future, None)
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self._waiters: dict[asyncio.Future, int] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.cancelled = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if future.cancelled():
+            self.cancelled += 1
+        else:
+            future.exception()
+
+    def join(self, key: Hashable) -> asyncio.Future | None:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        return future
+
+    def start(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        future = self.join(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done, key=key: self._forget(key, done))
+            self.leaders += 1
+        return future
+
+    async def wait(self, future: asyncio.Future) -> Any:
+        return await wait_shared(future, self._waiters)
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        return await self.wait(self.start(key, factory))
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+        }
@@ -1,6 +1,12 @@
 from __future__ import annotations
 
 import re
+import time
+
+
+def normalize_location(location: str) -> str:
+    collapsed = re.sub(r"\s+", " ", location.strip().lower())
+    return re.sub(r"\s*,\s*", ", ", collapsed)
 
 
 def candidate_locations(location: str) -> list[tuple[str, str | None]]:
@@ -14,12 +20,59 @@ def candidate_locations(location: str) -> list[tuple[str, str | None]]:
     return candidates
 
 
-def units_params(units: str) -> dict[str, str]:
-    if units == "imperial":
-        return {
-            "temperature_unit": "fahrenheit",
-            "wind_speed_unit": "mph",
-            "precipitation_unit": "inch",
-        }
-    return {"temperature_unit": "celsius", "wind_speed_unit": "kmh", "precipitation_unit": "mm"}
+METRIC_UNITS_PARAMS = {"temperature_unit": "celsius", "wind_speed_unit": "kmh", "precipitation_unit": "mm"}
+METRIC_UNIT_LABELS = {"temperature": "°C", "wind_speed": "km/h", "precipitation": "mm"}
+IMPERIAL_UNIT_LABELS = {"temperature": "°F", "wind_speed": "mp/h", "precipitation": "inch"}
+
+TEMPERATURE_FIELDS = {"temperature_2m", "apparent_temperature", "temperature_2m_max", "temperature_2m_min"}
+WIND_SPEED_FIELDS = {"wind_speed_10m", "wind_speed_10m_max"}
+PRECIPITATION_FIELDS = {"precipitation", "precipitation_sum"}
+
+
+def _celsius_to_fahrenheit(value: float) -> float:
+    return round(value * 9 / 5 + 32, 1)
+
+
+def _kmh_to_mph(value: float) -> float:
+    return round(value / 1.609344, 1)
+
+
+def _mm_to_inch(value: float) -> float:
+    return round(value / 25.4, 3)
+
+
+def _converter(field: str):
+    if field in TEMPERATURE_FIELDS:
+        return _celsius_to_fahrenheit
+    if field in WIND_SPEED_FIELDS:
+        return _kmh_to_mph
+    if field in PRECIPITATION_FIELDS:
+        return _mm_to_inch
+    return None
+
+
+def convert_block(block: dict, units: str) -> dict:
+    if units != "imperial" or not block:
+        return block
+    converted = {}
+    for field, value in block.items():
+        convert = _converter(field)
+        if convert is None:
+            converted[field] = value
+        elif isinstance(value, list):
+            converted[field] = [convert(item) if isinstance(item, (int, float)) else item for item in value]
+        elif isinstance(value, (int, float)):
+            converted[field] = convert(value)
+        else:
+            converted[field] = value
+    return converted
+
+
+def unit_labels(units: str) -> dict[str, str]:
+    return dict(IMPERIAL_UNIT_LABELS if units == "imperial" else METRIC_UNIT_LABELS)
+
 
+def forecast_ttl(update_interval: float) -> float:
+    if update_interval <= 0:
+        return 0.0
+    return update_interval - (time.time() % update_interval)
@@ -0,0 +1,64 @@
+"""Compare two benchmark reports written by ``bench.loadgen``."""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+METRICS = [
+    ("rps", ("rps",), True),
+    ("errors", ("errors",), False),
+    ("ttft p50", ("ttft_seconds", "p50"), False),
+    ("ttft p95", ("ttft_seconds", "p95"), False),
+    ("ttft p99", ("ttft_seconds", "p99"), False),
+    ("latency p50", ("latency_seconds", "p50"), False),
+    ("latency p95", ("latency_seconds", "p95"), False),
+    ("latency p99", ("latency_seconds", "p99"), False),
+    ("cpu/request", ("server", "cpu_seconds_per_request"), False),
+    ("rss", ("server", "rss_bytes"), False),
+]
+
+
+def load(name: str) -> dict:
+    path = Path(name)
+    if not path.exists():
+        path = RESULTS_DIR / f"{name}.json"
+    return json.loads(path.read_text())
+
+
+def lookup(report: dict, path: tuple[str, ...]) -> float | None:
+    value = report
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Show metric deltas between two benchmark reports.")
+    parser.add_argument("baseline", help="Report path or commit hash under bench/results/.")
+    parser.add_argument("candidate", help="Report path or commit hash under bench/results/.")
+    args = parser.parse_args()
+
+    baseline = load(args.baseline)
+    candidate = load(args.candidate)
+    if baseline.get("config") != candidate.get("config"):
+        print("warning: reports were produced with different load settings")
+    print(f"{'metric':<14}{baseline['commit']:>14}{candidate['commit']:>14}{'change':>10}")
+    for label, path, higher_is_better in METRICS:
+        old = lookup(baseline, path)
+        new = lookup(candidate, path)
+        if old is None or new is None:
+            continue
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        better = new > old if higher_is_better else new < old
+        marker = "" if new == old else (" better" if better else " worse")
+        print(f"{label:<14}{old:>14.4g}{new:>14.4g}{change:>10}{marker}")
+
+
+if __name__ == "__main__":
+    main()
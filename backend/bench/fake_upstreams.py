@@ -0,0 +1,253 @@
+"""Deterministic stand-ins for Open-Meteo and the OpenAI chat API used by the benchmarks.
+
+Run with ``python -m bench.fake_upstreams --port 9100`` and point GEOCODE_API_URL,
+FORECAST_API_URL and OPENAI_BASE_URL at it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.core.constants import CURRENT_VARIABLES, DAILY_VARIABLES, HOURLY_VARIABLES
+
+REPLY = (
+    "Right now it is mild with a light breeze and a few clouds drifting through. "
+    "Expect the afternoon to stay dry, with a small chance of showers later in the week. "
+    "A light jacket should be plenty if you are heading out this evening."
+)
+
+
+class FakeConfig:
+    def __init__(
+        self,
+        weather_latency_ms: float = 40.0,
+        llm_latency_ms: float = 300.0,
+        tokens_per_second: float = 60.0,
+        error_rate: float = 0.0,
+        seed: int = 7,
+    ) -> None:
+        self.weather_latency_ms = weather_latency_ms
+        self.llm_latency_ms = llm_latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+
+
+def _stable_number(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.lower().encode(), digest_size=8).digest(), "big")
+
+
+def _place(name: str) -> dict:
+    number = _stable_number(name)
+    return {
+        "name": name.title(),
+        "country": "Benchland",
+        "admin1": "Fake Region",
+        "latitude": round((number % 12000) / 100 - 60, 4),
+        "longitude": round((number // 12000 % 36000) / 100 - 180, 4),
+    }
+
+
+def _series(count: int, seed: int, low: float, spread: float) -> list[float]:
+    return [round(low + ((seed + index * 37) % 100) / 100 * spread, 1) for index in range(count)]
+
+
+def _forecast(latitude: float, longitude: float, days: int) -> dict:
+    seed = _stable_number(f"{latitude},{longitude}") % 1000
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    hours = days * 24
+    hourly_times = [(start + timedelta(hours=index)).strftime("%Y-%m-%dT%H:%M") for index in range(hours)]
+    daily_times = [(start + timedelta(days=index)).strftime("%Y-%m-%d") for index in range(days)]
+    hourly_values = {
+        "temperature_2m": _series(hours, seed, 5, 20),
+        "precipitation_probability": [int(value) for value in _series(hours, seed, 0, 100)],
+        "weather_code": [(seed + index) % 4 for index in range(hours)],
+        "wind_speed_10m": _series(hours, seed, 2, 30),
+    }
+    daily_values = {
+        "weather_code": [(seed + index) % 4 for index in range(days)],
+        "temperature_2m_max": _series(days, seed, 15, 10),
+        "temperature_2m_min": _series(days, seed, 0, 10),
+        "precipitation_sum": _series(days, seed, 0, 8),
+        "wind_speed_10m_max": _series(days, seed, 10, 30),
+        "sunrise": [f"{day}T06:{seed % 60:02d}" for day in daily_times],
+        "sunset": [f"{day}T19:{seed % 60:02d}" for day in daily_times],
+    }
+    current_values = {
+        "temperature_2m": hourly_values["temperature_2m"][0],
+        "relative_humidity_2m": 40 + seed % 50,
+        "apparent_temperature": hourly_values["temperature_2m"][0] - 1,
+        "precipitation": 0.0,
+        "weather_code": seed % 4,
+        "wind_speed_10m": hourly_values["wind_speed_10m"][0],
+        "wind_direction_10m": seed % 360,
+    }
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "timezone": "UTC",
+        "current": {"time": hourly_times[0], "interval": 900, **{key: current_values[key] for key in CURRENT_VARIABLES}},
+        "hourly": {"time": hourly_times, **{key: hourly_values[key] for key in HOURLY_VARIABLES}},
+        "daily": {"time": daily_times, **{key: daily_values[key] for key in DAILY_VARIABLES}},
+    }
+
+
+def _chunk(delta: dict, finish_reason: str | None = None) -> str:
+    payload = {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": "bench",
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def _usage(body: dict, seen_prefixes: set[str], completion_tokens: int) -> dict:
+    # Mimics provider prompt caching: the leading tools and system messages are
+    # reusable in 128-token blocks once a request with the same prefix was seen.
+    messages = body.get("messages") or []
+    leading = []
+    for message in messages:
+        if message.get("role") != "system":
+            break
+        leading.append(message)
+    prefix = json.dumps([body.get("tools"), leading], sort_keys=True)
+    prompt_tokens = len(json.dumps([body.get("tools"), messages])) // 4
+    cached = (len(prefix) // 4) // 128 * 128 if prefix in seen_prefixes else 0
+    seen_prefixes.add(prefix)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": min(cached, prompt_tokens)},
+    }
+
+
+def _last_user_text(messages: list[dict]) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            return message.get("content") or ""
+    return ""
+
+
+def _locations_from(text: str) -> list[str]:
+    lowered = text.lower()
+    for marker in (" in ", " for "):
+        if marker in lowered:
+            tail = text[lowered.rindex(marker) + len(marker):].strip(" ?.!")
+            names = [part.strip() for part in tail.replace(" and ", ",").split(",") if part.strip()]
+            if names:
+                return names
+    return ["London"]
+
+
+def create_app(config: FakeConfig) -> FastAPI:
+    app = FastAPI()
+    seen_prefixes: set[str] = set()
+
+    async def weather_delay() -> bool:
+        await asyncio.sleep(config.weather_latency_ms / 1000 * (0.5 + config.random.random()))
+        return config.random.random() < config.error_rate
+
+    @app.get("/v1/search")
+    async def search(name: str, count: int = 3):
+        if await weather_delay():
+            return JSONResponse({"error": True, "reason": "injected failure"}, status_code=503)
+        return {"results": [_place(name)][:count]}
+
+    @app.get("/v1/forecast")
+    async def forecast(latitude: str, longitude: str, forecast_days: int = 3):
+        if await weather_delay():
+            return JSONResponse({"error": True, "reason": "injected failure"}, status_code=503)
+        points = list(zip(latitude.split(","), longitude.split(",")))
+        data = [_forecast(float(lat), float(lon), forecast_days) for lat, lon in points]
+        return data[0] if len(data) == 1 else data
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages") or []
+        if config.random.random() < config.error_rate:
+            return JSONResponse({"error": {"message": "injected failure"}}, status_code=500)
+        follow_up = bool(messages) and messages[-1].get("role") == "tool"
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+        async def events():
+            await asyncio.sleep(config.llm_latency_ms / 1000)
+            if follow_up:
+                delay = 1 / config.tokens_per_second if config.tokens_per_second > 0 else 0
+                for word in REPLY.split(" "):
+                    yield _chunk({"content": word + " "})
+                    if delay:
+                        await asyncio.sleep(delay)
+                yield _chunk({}, "stop")
+            else:
+                locations = _locations_from(_last_user_text(messages))
+                arguments = json.dumps({"locations": locations} if len(locations) > 1 else {"location": locations[0]})
+                yield _chunk(
+                    {
+                        "role": "assistant",
+                        "tool_calls": [
+                            {
+                                "index": 0,
+                                "id": f"call_{_stable_number(arguments) % 10**8}",
+                                "type": "function",
+                                "function": {"name": "get_weather", "arguments": ""},
+                            }
+                        ],
+                    }
+                )
+                for start in range(0, len(arguments), 8):
+                    yield _chunk({"tool_calls": [{"index": 0, "function": {"arguments": arguments[start:start + 8]}}]})
+                yield _chunk({}, "tool_calls")
+            if include_usage:
+                completion_tokens = len(REPLY.split(" ")) if follow_up else 20
+                payload = {
+                    "id": "chatcmpl-bench",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": "bench",
+                    "choices": [],
+                    "usage": _usage(body, seen_prefixes, completion_tokens),
+                }
+                yield f"data: {json.dumps(payload)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake Open-Meteo and OpenAI upstreams for benchmarking.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--weather-latency-ms", type=float, default=40.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--tokens-per-second", type=float, default=60.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    config = FakeConfig(
+        weather_latency_ms=args.weather_latency_ms,
+        llm_latency_ms=args.llm_latency_ms,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Measure memory per cached forecast for raw Open-Meteo dicts vs the columnar model.
+
+Run with ``python -m bench.forecast_memory --forecasts 1000 --days 7``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from app.utils.forecast_model import Forecast
+from bench.fake_upstreams import _forecast
+
+
+def _measure(build) -> tuple[int, list]:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, items
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare memory used by cached forecast representations.")
+    parser.add_argument("--forecasts", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=3)
+    args = parser.parse_args()
+
+    payloads = [json.dumps(_forecast(index / 10, index / 7, args.days)) for index in range(args.forecasts)]
+
+    raw_bytes, raw = _measure(lambda: [json.loads(payload) for payload in payloads])
+    columnar_bytes, columnar = _measure(lambda: [Forecast.from_dict(json.loads(payload)) for payload in payloads])
+
+    started = time.perf_counter()
+    for forecast in columnar:
+        forecast.to_dict()
+    to_dict_us = (time.perf_counter() - started) / len(columnar) * 1e6
+
+    assert columnar[0].to_dict() == raw[0], "columnar round trip changed the forecast"
+    count = args.forecasts
+    print(f"{count} forecasts, {args.days} days each")
+    print(f"  dict of lists  {raw_bytes / count:>10.0f} bytes/forecast")
+    print(f"  columnar       {columnar_bytes / count:>10.0f} bytes/forecast ({columnar_bytes / raw_bytes:.0%})")
+    print(f"  to_dict        {to_dict_us:>10.1f} us/forecast")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""Closed-loop load generator for the chat stream endpoint.
+
+By default it starts the fake upstreams and the API under uvicorn, drives
+``/api/chat/stream`` at a fixed concurrency and writes a JSON report to
+``bench/results/<commit>.json``. Use ``--target`` to benchmark a running server.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+PROMPTS = [
+    "What's the weather in London?",
+    "How warm is it in Paris today?",
+    "Compare the weather in Berlin and Madrid",
+    "Will it rain in Seattle?",
+    "Weather for Tokyo, Osaka and Kyoto",
+    "Is it windy in Chicago?",
+]
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[rank]
+
+
+def summarize(values: list[float]) -> dict:
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+def process_usage(pid: int) -> dict | None:
+    # Linux only; other platforms report no resource usage.
+    try:
+        fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+        status = Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+    rss_kb = next((int(line.split()[1]) for line in status.splitlines() if line.startswith("VmRSS:")), 0)
+    return {"cpu_seconds": (int(fields[11]) + int(fields[12])) / ticks, "rss_bytes": rss_kb * 1024}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run_request(client: httpx.AsyncClient, url: str, prompt: str, units: str) -> dict:
+    body = {"messages": [{"role": "user", "content": prompt}], "settings": {"units": units}}
+    started = time.perf_counter()
+    ttft = None
+    error = None
+    try:
+        async with client.stream("POST", url, json=body) as response:
+            if response.status_code != 200:
+                await response.aread()
+                return {"ok": False, "status": response.status_code, "latency": time.perf_counter() - started}
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[6:])
+                if event.get("type") == "token" and ttft is None:
+                    ttft = time.perf_counter() - started
+                elif event.get("type") == "error":
+                    error = event.get("message")
+    except httpx.HTTPError as exc:
+        return {"ok": False, "status": None, "error": type(exc).__name__, "latency": time.perf_counter() - started}
+    return {
+        "ok": error is None,
+        "status": 200,
+        "error": error,
+        "ttft": ttft,
+        "latency": time.perf_counter() - started,
+    }
+
+
+async def drive(target: str, concurrency: int, requests: int, duration: float | None, units: str, seed: int) -> tuple[list[dict], float]:
+    url = f"{target.rstrip('/')}/api/chat/stream"
+    rng = random.Random(seed)
+    results: list[dict] = []
+    issued = 0
+    deadline = time.perf_counter() + duration if duration else None
+
+    def next_prompt() -> str | None:
+        nonlocal issued
+        if deadline is not None:
+            if time.perf_counter() >= deadline:
+                return None
+        elif issued >= requests:
+            return None
+        issued += 1
+        return rng.choice(PROMPTS)
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        while (prompt := next_prompt()) is not None:
+            results.append(await run_request(client, url, prompt, units))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=60.0, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return results, elapsed
+
+
+async def wait_ready(url: str, timeout: float = 20.0) -> None:
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(timeout=1.0) as client:
+        while time.perf_counter() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def start_servers(args: argparse.Namespace) -> tuple[list[subprocess.Popen], str, int]:
+    fake_url = f"http://127.0.0.1:{args.fake_port}"
+    output = None if args.server_logs else subprocess.DEVNULL
+    fake = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "bench.fake_upstreams",
+            "--port",
+            str(args.fake_port),
+            "--weather-latency-ms",
+            str(args.weather_latency_ms),
+            "--llm-latency-ms",
+            str(args.llm_latency_ms),
+            "--tokens-per-second",
+            str(args.tokens_per_second),
+            "--error-rate",
+            str(args.error_rate),
+        ],
+        cwd=BACKEND_DIR,
+        stdout=output,
+        stderr=output,
+    )
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"{fake_url}/v1",
+        "GEOCODE_API_URL": f"{fake_url}/v1/search",
+        "FORECAST_API_URL": f"{fake_url}/v1/forecast",
+    }
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.api_port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=output,
+        stderr=output,
+    )
+    return [fake, api], f"http://127.0.0.1:{args.api_port}", api.pid
+
+
+def build_report(args: argparse.Namespace, results: list[dict], elapsed: float, before: dict | None, after: dict | None) -> dict:
+    succeeded = [item for item in results if item["ok"]]
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "duration": args.duration,
+            "units": args.units,
+            "weather_latency_ms": args.weather_latency_ms,
+            "llm_latency_ms": args.llm_latency_ms,
+            "tokens_per_second": args.tokens_per_second,
+            "error_rate": args.error_rate,
+        },
+        "requests": len(results),
+        "errors": len(results) - len(succeeded),
+        "elapsed_seconds": elapsed,
+        "rps": len(results) / elapsed if elapsed else 0.0,
+        "ttft_seconds": summarize([item["ttft"] for item in succeeded if item.get("ttft") is not None]),
+        "latency_seconds": summarize([item["latency"] for item in succeeded]),
+    }
+    if before and after:
+        report["server"] = {
+            "cpu_seconds_per_request": (after["cpu_seconds"] - before["cpu_seconds"]) / max(1, len(results)),
+            "rss_bytes": after["rss_bytes"],
+            "rss_growth_bytes": after["rss_bytes"] - before["rss_bytes"],
+        }
+    return report
+
+
+def print_report(report: dict) -> None:
+    print(f"commit {report['commit']}: {report['requests']} requests, {report['errors']} errors, {report['rps']:.1f} req/s")
+    for name in ("ttft_seconds", "latency_seconds"):
+        stats = report[name]
+        if stats["count"]:
+            print(
+                f"  {name:<16} p50={stats['p50'] * 1000:.1f}ms p95={stats['p95'] * 1000:.1f}ms "
+                f"p99={stats['p99'] * 1000:.1f}ms"
+            )
+    server = report.get("server")
+    if server:
+        print(
+            f"  server cpu/request={server['cpu_seconds_per_request'] * 1000:.2f}ms "
+            f"rss={server['rss_bytes'] / 2**20:.1f}MiB (+{server['rss_growth_bytes'] / 2**20:.1f}MiB)"
+        )
+
+
+async def main_async(args: argparse.Namespace) -> dict:
+    processes: list[subprocess.Popen] = []
+    target = args.target
+    server_pid = args.server_pid
+    try:
+        if target is None:
+            processes, target, server_pid = start_servers(args)
+            await wait_ready(f"http://127.0.0.1:{args.fake_port}/v1/search?name=warmup")
+        await wait_ready(f"{target.rstrip('/')}/health")
+        if args.warmup:
+            await drive(target, min(args.concurrency, args.warmup), args.warmup, None, args.units, args.seed + 1)
+        before = process_usage(server_pid) if server_pid else None
+        results, elapsed = await drive(target, args.concurrency, args.requests, args.duration, args.units, args.seed)
+        after = process_usage(server_pid) if server_pid else None
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+    return build_report(args, results, elapsed, before, after)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the chat stream endpoint.")
+    parser.add_argument("--target", help="Base URL of a running API; skips starting local servers.")
+    parser.add_argument("--server-pid", type=int, help="PID of --target's server for CPU/memory sampling.")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--duration", type=float, help="Run for this many seconds instead of a fixed request count.")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--units", choices=["metric", "imperial"], default="metric")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--api-port", type=int, default=8765)
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--weather-latency-ms", type=float, default=40.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--tokens-per-second", type=float, default=60.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--server-logs", action="store_true", help="Show output from the spawned servers.")
+    parser.add_argument("--output", help="Report path (default: bench/results/<commit>.json).")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    print_report(report)
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services import weather
+from app.utils.gazetteer import Gazetteer, build_gazetteer
+
+CITIES = [
+    # geonameid, name, asciiname, alternatenames, latitude, longitude, feature class,
+    # feature code, country code, cc2, admin1, admin2, admin3, admin4, population
+    ("1", "Avondale", "Avondale", "", "33.4", "-112.3", "P", "PPL", "US", "", "AZ", "", "", "", "89000"),
+    ("2", "Kingston", "Kingston", "", "17.99", "-76.79", "P", "PPLC", "JM", "", "08", "", "", "", "937700"),
+    ("3", "Paris", "Paris", "", "48.85", "2.35", "P", "PPLC", "FR", "", "11", "", "", "", "2138551"),
+]
+
+
+@pytest.fixture(autouse=True)
+def fresh_geocoder(monkeypatch):
+    # Failures must not reach the shared circuit breaker or leave cached
+    # answers behind for other tests.
+    monkeypatch.setattr(weather, "_geocode_upstream", weather._upstream("geocoding API", weather.geocode_limiter))
+    weather._geocode_cache.clear()
+    weather._geocode_misses.clear()
+    yield
+    weather._geocode_cache.clear()
+    weather._geocode_misses.clear()
+
+
+@pytest.fixture
+def gazetteer(tmp_path, monkeypatch):
+    cities = tmp_path / "cities.txt"
+    cities.write_text("".join("\t".join(row) + "\n" for row in CITIES), encoding="utf-8")
+    path = tmp_path / "gazetteer.bin"
+    build_gazetteer(str(cities), str(path))
+    loaded = Gazetteer(path)
+    monkeypatch.setattr(weather, "_gazetteer", loaded)
+    yield loaded
+    loaded.close()
+
+
+def test_lookup_is_exact_unless_prefix_is_requested(gazetteer):
+    assert gazetteer.lookup("Paris")["name"] == "Paris"
+    assert gazetteer.lookup("Avon") is None
+    assert gazetteer.lookup("Kings") is None
+    assert gazetteer.lookup("Avon", prefix=True)["name"] == "Avondale"
+    assert gazetteer.lookup("Kings", prefix=True)["name"] == "Kingston"
+
+
+def _geocode(location: str, handler) -> dict:
+    async def run() -> dict:
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await weather.geocode_location(client, location)
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize(("location", "remote"), [("Avon", "Avon"), ("Kings", "Kings Lynn")])
+def test_remote_geocoder_wins_over_prefix_matches(gazetteer, location, remote):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"results": [{"name": remote, "latitude": 1.0, "longitude": 2.0}]})
+
+    assert _geocode(location, handler)["name"] == remote
+
+
+def test_prefix_match_is_a_fallback_when_the_geocoder_fails(gazetteer):
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    assert _geocode("Avon", handler)["name"] == "Avondale"
+
+
+def test_prefix_match_is_not_used_for_unknown_places(gazetteer):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={})
+
+    with pytest.raises(weather.LocationNotFoundError):
+        _geocode("Avon", handler)
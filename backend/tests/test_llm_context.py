@@ -0,0 +1,32 @@
+from app.core.config import settings
+from app.services.llm_context import window_messages
+
+
+def test_only_leading_system_messages_are_pinned():
+    messages = [
+        {"role": "system", "content": "You are a weather assistant."},
+        {"role": "user", "content": "Weather in Paris?"},
+        {"role": "assistant", "content": "Sunny."},
+        {"role": "system", "content": "Answer in French from now on."},
+        {"role": "user", "content": "And Lyon?"},
+    ]
+
+    assert window_messages(messages) == messages
+
+
+def test_system_messages_from_summarized_turns_are_kept(monkeypatch):
+    monkeypatch.setattr(settings, "context_token_budget", 400)
+    monkeypatch.setattr(settings, "context_summary_token_budget", 100)
+    instruction = {"role": "system", "content": "Answer in French from now on."}
+    messages = [{"role": "system", "content": "You are a weather assistant."}]
+    for index in range(10):
+        messages.append({"role": "user", "content": f"Weather in city {index}? " + "please " * 20})
+        if index == 1:
+            messages.append(instruction)
+        messages.append({"role": "assistant", "content": "Sunny. " * 20})
+
+    windowed = window_messages(messages)
+
+    assert len(windowed) < len(messages)
+    assert windowed[0] == messages[0]
+    assert instruction in windowed
@@ -0,0 +1,43 @@
+import pytest
+
+from app.services.llm_router import match_weather_query
+
+
+@pytest.mark.parametrize(
+    ("text", "locations"),
+    [
+        ("What's the weather in Seattle?", ["Seattle"]),
+        ("weather for Paris today", ["Paris"]),
+        ("Compare London and Berlin", ["London", "Berlin"]),
+        ("compare the weather in Oslo vs Madrid", ["Oslo", "Madrid"]),
+        ("What is the weather in Spain like?", ["Spain"]),
+        ("weather in New York today", ["New York"]),
+    ],
+)
+def test_matches_plain_weather_queries(text, locations):
+    assert match_weather_query(text) == locations
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Nice weather",
+        "Cold weather",
+        "Nice weather today, isn't it?",
+        "Weather for Tokyo, Osaka and Kyoto",
+        "Compare Tokyo, Osaka and Kyoto",
+        "weather in Tokyo and Osaka",
+        "What's the weather in Paris, France?",
+        "Should I bring an umbrella in London?",
+        "weather in the morning",
+        "compare today and tomorrow",
+        "Weather for next week",
+        "weather at home",
+        "How is the weather at the beach?",
+        "what is the forecast for tonight in Boston",
+        "weather in Paris in fahrenheit",
+        "weather in celsius",
+    ],
+)
+def test_declines_small_talk_and_ambiguous_lists(text):
+    assert match_weather_query(text) is None
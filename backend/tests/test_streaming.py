@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+from app.api.streaming import coalesce_tokens
+
+
+async def _collect(events, window_seconds: float = 0.2) -> list[dict]:
+    return [event async for event in coalesce_tokens(events, window_seconds, 256)]
+
+
+def test_first_token_is_sent_at_once_and_the_rest_coalesce():
+    async def events():
+        for value in "abc":
+            yield {"type": "token", "value": value}
+        yield {"type": "done"}
+
+    assert asyncio.run(_collect(events())) == [
+        {"type": "token", "value": "a"},
+        {"type": "token", "value": "bc"},
+        {"type": "done"},
+    ]
+
+
+def test_buffered_tokens_are_flushed_before_a_source_error():
+    async def events():
+        yield {"type": "token", "value": "a"}
+        yield {"type": "token", "value": "b"}
+        raise ValueError("upstream failed")
+
+    seen = []
+
+    async def run() -> None:
+        async for event in coalesce_tokens(events(), 0.2, 256):
+            seen.append(event)
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+    assert seen == [{"type": "token", "value": "a"}, {"type": "token", "value": "b"}]
@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+from app.core.config import settings
+from app.core.constants import DETAIL_GROUPS
+from app.services import warmer, weather
+from app.utils.popularity import DecayedTopN
+
+
+def test_popular_entry_is_refetched_across_the_boundary(monkeypatch):
+    # The lead must exceed jitter + 1s, as with the defaults, for extended
+    # entries to look fresher than the refresh threshold.
+    lead, jitter = 1.5, 0.2
+    boundary = time.time() + lead + 0.1
+    monkeypatch.setattr(settings, "forecast_warmer_refresh_ahead_seconds", lead)
+    monkeypatch.setattr(settings, "forecast_warmer_jitter_seconds", jitter)
+    monkeypatch.setattr(settings, "forecast_warmer_requests_per_second", 0)
+    # One boundary in the near future, then none for the rest of the test.
+    monkeypatch.setattr(warmer, "forecast_ttl", lambda _: boundary - time.time() if time.time() < boundary else 60.0)
+
+    groups = DETAIL_GROUPS["full"]
+    key = weather._forecast_key(51.5, -0.12, 3, groups)
+    fetched_at = []
+
+    async def load_chunk(client, keys, points, forecast_days, chunk_groups):
+        fetched_at.append(time.time())
+        for chunk_key in keys:
+            weather._forecast_cache.set(chunk_key, "new")
+
+    monkeypatch.setattr(weather, "_load_forecast_chunk", load_chunk)
+    monkeypatch.setattr(weather, "get_http_client", lambda: None)
+
+    async def run() -> list:
+        weather._forecast_cache.set(key, "old", ttl=boundary - time.time())
+        weather._popularity.record(key, ((51.5, -0.12), 3, groups))
+        task = asyncio.create_task(warmer._run_warmer())
+        seen = []
+        try:
+            while time.time() < boundary + jitter + 0.5:
+                seen.append(weather._forecast_cache.get(key))
+                await asyncio.sleep(0.01)
+        finally:
+            task.cancel()
+        return seen
+
+    try:
+        seen = asyncio.run(run())
+    finally:
+        weather._forecast_cache.delete(key)
+
+    assert None not in seen
+    assert len(fetched_at) == 1
+    assert boundary <= fetched_at[0] <= boundary + jitter + 0.1
+    assert seen[-1] == "new"
+
+
+def test_user_lookup_joins_an_in_flight_refresh(monkeypatch):
+    groups = DETAIL_GROUPS["full"]
+    key = weather._forecast_key(48.85, 2.35, 3, groups)
+    loads = []
+
+    async def load_chunk(client, keys, points, forecast_days, chunk_groups):
+        loads.append(list(keys))
+        await asyncio.sleep(0.05)
+        return ["new" for _ in keys]
+
+    monkeypatch.setattr(weather, "_load_forecast_chunk", load_chunk)
+    monkeypatch.setattr(weather, "get_http_client", lambda: None)
+    monkeypatch.setattr(weather, "_popularity", DecayedTopN(8, 3600.0))
+
+    async def run() -> list:
+        weather._popularity.record(key, ((48.85, 2.35), 3, groups))
+        refresh = asyncio.create_task(weather.refresh_popular_forecasts(60.0, 0, {key}))
+        await asyncio.sleep(0.01)
+        forecasts = await weather._fetch_forecasts(None, [(48.85, 2.35)], groups, 3)
+        await refresh
+        return forecasts
+
+    try:
+        assert asyncio.run(run()) == ["new"]
+    finally:
+        weather._forecast_cache.delete(key)
+    assert loads == [[key]]
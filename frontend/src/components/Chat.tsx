@@ -28,6 +28,7 @@ const Chat = () => {
   const [settings, setSettings] = useState<ChatSettings>({ units: "metric" });
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const messagesContainerRef = useRef<HTMLDivElement>(null);
+  const sessionIdRef = useRef<string | null>(null);
   const { toasts, error: showError, warning: showWarning, removeToast } = useToast();
 
   const scrollToBottom = () => {
@@ -66,7 +67,12 @@ const Chat = () => {
         }
         if (isToolError(payload)) {
           const errorMsg = payload.message || "An error occurred while fetching weather data.";
-          showError(errorMsg);
+          // Streamed comparisons report failed places individually; the rest still render.
+          if (payload.location) {
+            showWarning(errorMsg);
+          } else {
+            showError(errorMsg);
+          }
           setMessages((prev: Message[]) =>
             prev.map((message: Message) =>
               message.id === assistantId
@@ -81,16 +87,22 @@ const Chat = () => {
           }
           setMessages((prev: Message[]) =>
             prev.map((message: Message) =>
-              message.id === assistantId ? { ...message, weather: payload.results } : message
+              message.id === assistantId
+                ? { ...message, weather: [...(message.weather ?? []), ...payload.results] }
+                : message
             )
           );
         } else {
           setMessages((prev: Message[]) =>
             prev.map((message: Message) =>
-              message.id === assistantId ? { ...message, weather: [payload] } : message
+              message.id === assistantId
+                ? { ...message, weather: [...(message.weather ?? []), payload] }
+                : message
             )
           );
         }
+      } else if (event.type === "session") {
+        sessionIdRef.current = event.id;
       } else if (event.type === "status") {
         if (!event.message) {
           console.warn("Received empty status message");
@@ -147,7 +159,7 @@ const Chat = () => {
 
     const history = [...messages, userMessage];
     try {
-      await streamChat(history, settings, handleEvent(assistantMessage.id));
+      await streamChat(history, settings, handleEvent(assistantMessage.id), sessionIdRef.current);
     } catch (err) {
       console.error("Stream error:", err);
       const errorMsg =
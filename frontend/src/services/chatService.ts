@@ -80,29 +80,37 @@ const fetchWithTimeout = async (
 
 const CHAT_STREAM_URL = buildApiUrl(API_BASE_URL, "/api/chat/stream");
 
+const toRequestMessage = (message: Message) => ({
+  role: message.role,
+  content: message.content,
+});
+
 export const streamChat = async (
   messages: Message[],
   settings: ChatSettings,
   onEvent: StreamHandler,
+  sessionId: string | null = null,
   retryCount = 0
 ): Promise<void> => {
   try {
+    // With a server-side session only the newest message is sent.
+    const body = sessionId
+      ? { messages: messages.slice(-1).map(toRequestMessage), settings, sessionId }
+      : { messages: messages.map(toRequestMessage), settings, startSession: true };
     const response = await fetchWithTimeout(
       CHAT_STREAM_URL,
       {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({
-          messages: messages.map((message) => ({
-            role: message.role,
-            content: message.content,
-          })),
-          settings,
-        }),
+        body: JSON.stringify(body),
       },
       TIMEOUT_MS
     );
 
+    if (sessionId && response.status === 404) {
+      return streamChat(messages, settings, onEvent, null, retryCount);
+    }
+
     if (!response.ok) {
       let errorBody: unknown;
       try {
@@ -116,7 +124,7 @@ export const streamChat = async (
 
       if (isRetryable && retryCount < MAX_RETRIES) {
         await new Promise((resolve) => setTimeout(resolve, RETRY_DELAY_MS * (retryCount + 1)));
-        return streamChat(messages, settings, onEvent, retryCount + 1);
+        return streamChat(messages, settings, onEvent, sessionId, retryCount + 1);
       }
 
       throw new StreamError(errorMessage, "HTTP_ERROR", response.status, isRetryable);
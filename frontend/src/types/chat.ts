@@ -16,7 +16,9 @@ export type StreamEvent =
   | { type: "token"; value: string }
   | { type: "tool"; name: string; payload: WeatherToolPayload }
   | { type: "status"; message: string }
+  | { type: "session"; id: string }
   | { type: "error"; message: string }
+  | { type: "timing"; stages: Record<string, { count: number; total_ms: number; max_ms: number }> }
   | { type: "done" };
 
 export type WeatherPayload = {
@@ -41,6 +43,7 @@ export type WeatherPayload = {
 export type ToolError = {
   error: true;
   message: string;
+  location?: string;
 };
 
 export type WeatherToolPayload =